@@ -0,0 +1,11 @@
+"""Point d'entrée en ligne de commande : `python -m barrins_app`."""
+
+import sys
+from pathlib import Path
+
+# Les modules de l'application s'importent entre eux sans préfixe de paquet
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mtgdc_cli import main  # noqa: E402
+
+sys.exit(main())
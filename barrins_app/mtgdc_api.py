@@ -0,0 +1,384 @@
+"""Module de l'API HTTP locale, en lecture seule, sur les tournois en base.
+
+Routes (réponses JSON) :
+* `/tournaments?sort=date&order=desc&limit=50&cursor=...` : liste paginée ;
+* `/tournaments/<id>` : tournoi, decks et decklists, au format de
+  `MTGTournoi.to_dict` ;
+* `/cards/usage?name=...&limit=50` : utilisation d'une carte, ou des cartes
+  les plus jouées sans `name`.
+
+Les réponses sont gardées en mémoire jusqu'à l'arrivée de nouveaux tournois ;
+ETag et Last-Modified suivent la même version des données.
+"""
+
+import base64
+import hashlib
+import http.client
+import itertools
+import json
+import re
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+import mtgdc_database
+from mtgdc_browser import SORT_COLUMNS, TournamentBrowser
+from mtgdc_database import Tournois, card_usage, init_database, tournament_dicts
+from sqlalchemy import func, select
+
+HOST = "127.0.0.1"
+PORT = 8026
+MAX_LIMIT = 500
+CACHE_SIZE = 1024  # Réponses gardées en mémoire
+VERSION_SECONDS = 1.0  # Intervalle minimal entre deux lectures de la version
+
+ROUTES = [
+    (re.compile(r"^/tournaments$"), "tournaments"),
+    (re.compile(r"^/tournaments/(\d+)$"), "tournament"),
+    (re.compile(r"^/cards/usage$"), "usage"),
+]
+
+
+class APIError(Exception):
+    """Erreur renvoyée au client avec son code HTTP."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def encode_cursor(key: tuple) -> str:
+    """Curseur opaque d'après la clé (valeur de tri, id) de la pagination."""
+
+    raw = json.dumps([str(key[0]) if isinstance(key[0], date) else key[0], key[1]])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """Clé de pagination d'un curseur."""
+
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        value, tournoi_id = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if sort == "date":
+            value = date.fromisoformat(value)
+        return value, int(tournoi_id)
+    except (ValueError, TypeError) as error:
+        raise APIError(400, f"Curseur invalide : {cursor}") from error
+
+
+class TournamentAPI:
+    """Réponses de l'API, avec cache invalidé par l'arrivée de tournois."""
+
+    def __init__(self, cache_size: int = CACHE_SIZE) -> None:
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.version = None
+        self.modified = None
+        self.checked = 0.0
+
+    def current_version(self) -> tuple:
+        """Version des données (nombre de tournois, dernier id).
+
+        Les tournois sont écrits avec leurs decks dans une seule transaction :
+        la version change à chaque ingestion. Elle est relue au plus une fois
+        par `VERSION_SECONDS`.
+        """
+
+        with self.lock:
+            if time.monotonic() - self.checked < VERSION_SECONDS:
+                return self.version
+
+        session = init_database()
+        version = tuple(
+            session.execute(
+                select(func.count(Tournois.id), func.max(Tournois.id))
+            ).one()
+        )
+        session.close()
+
+        with self.lock:
+            self.checked = time.monotonic()
+            if version != self.version:
+                if self.version is None:
+                    # Premier accès : date de dernière écriture de la base
+                    self.modified = int(mtgdc_database.DB_PATH.stat().st_mtime)
+                else:
+                    self.modified = int(time.time())
+                self.version = version
+                self.cache.clear()
+        return version
+
+    def etag(self, version: tuple, path: str) -> str:
+        """ETag d'une réponse pour une version des données."""
+
+        digest = hashlib.sha1(f"{version}:{path}".encode()).hexdigest()[:20]
+        return f'"{digest}"'
+
+    def respond(self, path: str, headers: dict = None) -> tuple:
+        """Réponse à une requête GET : (code, en-têtes, corps)."""
+
+        headers = headers or {}
+        version = self.current_version()
+        etag = self.etag(version, path)
+        response_headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(self.modified, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+
+        # La route est résolue avant les en-têtes conditionnels : une route ou
+        # un tournoi inconnu donne son erreur, jamais un 304
+        with self.lock:
+            body = self.cache.get(path)
+            if body is not None:
+                self.hits += 1
+                self.cache.move_to_end(path)
+        if body is None:
+            try:
+                body = json.dumps(self.route(path), default=str).encode()
+            except APIError as error:
+                body = json.dumps({"error": error.message}).encode()
+                return error.status, {}, body
+
+            with self.lock:
+                self.misses += 1
+                if version == self.version:
+                    self.cache[path] = body
+                    while len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+
+        if self.not_modified(headers, etag):
+            return 304, response_headers, b""
+        return 200, response_headers, body
+
+    def not_modified(self, headers: dict, etag: str) -> bool:
+        """La copie du client est-elle à jour ?
+
+        Appelée une fois la réponse trouvée : `If-None-Match: *` ne vaut que
+        pour une ressource qui existe.
+        """
+
+        if headers.get("If-None-Match"):
+            tags = [tag.strip() for tag in headers["If-None-Match"].split(",")]
+            return etag in tags or "*" in tags
+
+        if headers.get("If-Modified-Since"):
+            try:
+                since = parsedate_to_datetime(headers["If-Modified-Since"])
+            except (TypeError, ValueError):
+                return False
+            return self.modified <= since.timestamp()
+
+        return False
+
+    def route(self, path: str):
+        """Contenu de la réponse d'une route."""
+
+        url = urlsplit(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        for pattern, name in ROUTES:
+            match = pattern.match(url.path)
+            if match:
+                return getattr(self, name)(query, *match.groups())
+        raise APIError(404, f"Route inconnue : {url.path}")
+
+    def _limit(self, query: dict, default: int = 50) -> int:
+        """Paramètre `limit`, borné."""
+
+        try:
+            limit = int(query.get("limit", default))
+        except ValueError as error:
+            raise APIError(400, "limit doit être un entier") from error
+        if not 1 <= limit <= MAX_LIMIT:
+            raise APIError(400, f"limit doit être entre 1 et {MAX_LIMIT}")
+        return limit
+
+    def tournaments(self, query: dict) -> dict:
+        """Page de tournois, triée et paginée par curseur."""
+
+        sort = query.get("sort", "id")
+        order = query.get("order", "asc" if sort == "name" else "desc")
+        if sort not in SORT_COLUMNS or order not in ("asc", "desc"):
+            raise APIError(400, f"Tri invalide : {sort} {order}")
+
+        browser = TournamentBrowser(self._limit(query))
+        browser.sort = sort
+        browser.descending = order == "desc"
+        if "cursor" in query:
+            rows = browser.page_after(decode_cursor(query["cursor"], sort))
+        else:
+            rows = browser.first_page()
+
+        return {
+            "tournaments": [row._asdict() for row in rows],
+            "total": browser.count(),
+            "next": encode_cursor(browser.last_key) if browser.has_next else None,
+        }
+
+    def tournament(self, query: dict, tournoi_id: str) -> dict:
+        """Détail d'un tournoi."""
+
+        session = init_database()
+        response = tournament_dicts(
+            session, select(Tournois).where(Tournois.id == int(tournoi_id))
+        )
+        session.close()
+
+        if len(response) == 0:
+            raise APIError(404, f"Tournoi inconnu : {tournoi_id}")
+        return response[0]
+
+    def usage(self, query: dict) -> dict:
+        """Utilisation d'une carte, ou des cartes les plus jouées."""
+
+        session = init_database()
+        usage = card_usage(session, query.get("name"), self._limit(query))
+        session.close()
+
+        if "name" in query:
+            if len(usage) == 0:
+                raise APIError(404, f"Carte jamais jouée : {query['name']}")
+            return usage[0]
+        return {"cards": usage}
+
+    def stats(self) -> dict:
+        """Compteurs du cache de réponses."""
+
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Traduction HTTP des réponses de `TournamentAPI`."""
+
+    protocol_version = "HTTP/1.1"  # Connexions persistantes
+    disable_nagle_algorithm = True  # En-têtes et corps sont envoyés séparément
+
+    def do_GET(self) -> None:
+        try:
+            status, headers, body = self.server.api.respond(self.path, self.headers)
+        except Exception as error:
+            print("Erreur de l'API :", self.path, repr(error))
+            status, headers, body = 500, {}, b'{"error": "Erreur interne"}'
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        """Pas de journal par requête."""
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+
+def make_server(host: str = HOST, port: int = PORT, api: TournamentAPI = None):
+    """Serveur HTTP de l'API (port 0 : port libre choisi par le système)."""
+
+    server = _Server((host, port), _Handler)
+    server.api = api or TournamentAPI()
+    return server
+
+
+def serve(host: str = HOST, port: int = PORT) -> None:
+    """Service de l'API jusqu'à interruption."""
+
+    server = make_server(host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def sample_paths(limit: int = 20) -> list:
+    """Requêtes représentatives pour le test de charge, d'après la base."""
+
+    session = init_database()
+    tournoi_ids = session.execute(
+        select(Tournois.id).order_by(Tournois.id.desc()).limit(limit)
+    ).scalars()
+    paths = [f"/tournaments/{tournoi_id}" for tournoi_id in tournoi_ids]
+    usage = card_usage(session, limit=limit)
+    session.close()
+
+    paths += ["/cards/usage?name=" + quote(item["card"]) for item in usage]
+    paths += ["/tournaments", "/tournaments?sort=date", "/cards/usage"]
+    return paths
+
+
+def load_test(url: str, paths: list, requests: int = 2000, concurrency: int = 8):
+    """Envoi de `requests` requêtes en parallèle ; retourne débit et latences."""
+
+    url = urlsplit(url)
+    counter = itertools.count()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker():
+        connection = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+        while True:
+            index = next(counter)
+            if index >= requests:
+                break
+            start = time.perf_counter()
+            connection.request("GET", paths[index % len(paths)])
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "requests_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": 1000 * statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": (
+            1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+        ),
+        "max_ms": 1000 * latencies[-1] if latencies else 0.0,
+        "statuses": statuses,
+    }
+
+
+if __name__ == "__main__":
+    serve()
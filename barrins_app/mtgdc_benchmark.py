@@ -0,0 +1,829 @@
+"""Module de benchmark hors ligne du scrapping et de l'ingestion des cartes.
+
+Les pages d'événements, les exports MTGO et des fichiers MTGJSON réduits sont
+écrits dans un dossier de fixtures, puis servis par un serveur HTTP local qui
+remplace mtgtop8 : aucune requête ne part vers l'extérieur.
+"""
+
+import gzip
+import html
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import mtgdc_database
+from mtgdc_carddata import AllCards, AllSets, DBCards, clean_name
+from mtgdc_metrics import METRICS
+
+FIXTURES_VERSION = 1
+ENCODING = "iso-8859-1"  # Encodage des pages de mtgtop8
+
+SCALES = {
+    "small": {"cards": 1500, "sets": 40, "events": 24, "decks": 1000},
+    "medium": {"cards": 6000, "sets": 150, "events": 60, "decks": 4000},
+    "large": {"cards": 30000, "sets": 700, "events": 150, "decks": 16000},
+}
+EVENT_SIZES = (8, 32, 128)  # Nombre de decks des pages mesurées seules
+SCRAP_SIZES = (8, 16, 32, 8)  # Nombre de decks des tournois du run complet
+
+PARSE_PROCESSES = min(os.cpu_count() or 1, 4)  # Pool du cas scrap_run_pool
+
+# Ids hors de la plage réelle de mtgtop8
+PARSE_EVENT = 80000
+FIRST_EVENT = 90000
+
+SYLLABLES = [
+    "ar", "bel", "cor", "dra", "en", "fal", "gor", "hal", "is", "jor", "ka",
+    "lum", "mor", "nar", "or", "pel", "quen", "ra", "sul", "tor", "ul", "vor",
+    "wyn", "yth", "zel",
+]  # fmt: skip
+ACCENTS = {"a": "á", "e": "é", "o": "ö", "u": "û"}
+BASICS = ["Plains", "Island", "Swamp", "Mountain", "Forest"]
+TYPES = ["Creature — Elf", "Instant", "Sorcery", "Artifact", "Enchantment"]
+TOP8_RANKS = ["1", "2", "3-4", "3-4", "5-8", "5-8", "5-8", "5-8"]
+
+EMPTY_EVENT = "<html><body><div class='event_title'></div></body></html>"
+
+
+def _word(rng: random.Random) -> str:
+    """Mot inventé de deux ou trois syllabes."""
+
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+
+
+def _accented(name: str) -> str:
+    """Variante accentuée d'un nom (première voyelle accentuable)."""
+
+    for index, char in enumerate(name):
+        if char in ACCENTS:
+            return name[:index] + ACCENTS[char] + name[index + 1 :]
+    return name
+
+
+def _card(rng: random.Random, name: str, card_type: str, set_codes: list) -> dict:
+    """Entrée AtomicCards d'une carte."""
+
+    legalities = {"commander": "Legal", "duel": "Legal", "legacy": "Legal"}
+    if rng.random() < 0.03:
+        legalities["duel"] = "Banned"
+
+    first_print = rng.choice(set_codes)
+    return {
+        "name": name,
+        "type": card_type,
+        "manaValue": float(rng.randint(0, 7)),
+        "colorIdentity": rng.sample("WUBRG", rng.randint(0, 2)),
+        "text": " ".join(_word(rng).lower() for _ in range(rng.randint(4, 30))),
+        "firstPrinting": first_print,
+        "printings": [first_print],
+        "legalities": legalities,
+        "identifiers": {"scryfallOracleId": str(uuid.UUID(int=rng.getrandbits(128)))},
+    }
+
+
+def _catalog(rng: random.Random, nb_cards: int, set_codes: list) -> tuple:
+    """Cartes du fichier AtomicCards et noms tels que scrappés.
+
+    Retourne (données AtomicCards, commandants, cartes jouables) ; les deux
+    listes contiennent les noms tels qu'ils apparaissent dans les exports MTGO :
+    accents perdus pour une partie des cartes, seule la première moitié des
+    cartes doubles.
+    """
+
+    data = {}
+    commanders = []
+    playables = []
+    prefixes = set()
+
+    for name in BASICS:
+        data[name] = [_card(rng, name, f"Basic Land — {name}", set_codes)]
+
+    while len(data) < nb_cards:
+        index = len(data)
+        name = _word(rng) + " " + _word(rng)
+        if name in data or _accented(name) in data:
+            continue
+
+        scraped = name
+        if index % 33 == 0:
+            # Carte double : l'export ne contient que la première moitié
+            if name in prefixes:
+                continue
+            prefixes.add(name)
+            name = name + " // " + _word(rng)
+            card_type = "Instant // Sorcery"
+        elif index % 10 == 0:
+            card_type = "Legendary Creature — Elf Wizard"
+        else:
+            card_type = TYPES[index % len(TYPES)]
+
+        if index % 17 == 0:
+            name = _accented(name)
+            scraped = name if index % 2 else scraped
+
+        data[name] = [_card(rng, name, card_type, set_codes)]
+        if data[name][0]["legalities"]["duel"] != "Legal":
+            continue
+        if card_type.startswith("Legendary"):
+            commanders.append(scraped)
+        else:
+            playables.append(scraped)
+
+    # Entrées écartées par l'ingestion
+    for name, card_type in (("A-" + _word(rng), TYPES[0]), (_word(rng), "Scheme")):
+        data[name] = [_card(rng, name, card_type, set_codes)]
+
+    # Un préfixe partagé par deux cartes doubles n'est pas résolu par DBCards.get
+    split_keys = [clean_name(name) for name in data if " // " in name]
+    playables = [
+        name
+        for name in playables
+        if name in data
+        or sum(key.startswith(clean_name(name)) for key in split_keys) == 1
+    ]
+
+    return {"meta": {"version": "benchmark"}, "data": data}, commanders, playables
+
+
+def _set_list(rng: random.Random, nb_sets: int) -> dict:
+    """Contenu du fichier SetList."""
+
+    release = date(1993, 8, 5)
+    sets = []
+    for index in range(nb_sets):
+        release += timedelta(days=rng.randint(20, 120))
+        sets.append(
+            {
+                "code": f"B{index:03d}",
+                "name": _word(rng) + " " + _word(rng),
+                "releaseDate": release.isoformat(),
+            }
+        )
+    return {"meta": {"version": "benchmark"}, "data": sets}
+
+
+def _mtgo_export(rng: random.Random, commanders: list, playables: list) -> str:
+    """Export MTGO d'un deck de 100 cartes."""
+
+    singles = rng.sample(playables, 65)
+    basics = rng.sample(BASICS, 2)
+    lines = [f"1 {name}" for name in singles]
+    lines += [f"17 {basics[0]}", f"17 {basics[1]}"]
+    rng.shuffle(lines)
+    return "\r\n".join(lines + ["Sideboard", f"1 {rng.choice(commanders)}", ""])
+
+
+def _event_page(event_id: int, event: dict, deck_ids: list) -> str:
+    """Page d'un événement au format de mtgtop8."""
+
+    name = html.escape(event["name"])
+    blocks = []
+    for deck_id, rank in zip(deck_ids, TOP8_RANKS):
+        blocks.append(
+            "<div class='chosen_tr'>"
+            f"<div class='rank'>{rank}</div>"
+            f"<div><div class='S14'><a href='?e={event_id}&amp;d={deck_id}&amp;f=EDH'>"
+            "Archetype</a></div>"
+            f"<div class='G11'><a class='player'>Player {deck_id}</a></div></div>"
+            "</div>"
+        )
+
+    groups = []
+    out_decks = deck_ids[len(TOP8_RANKS) :]
+    for start in range(0, len(out_decks), 8):
+        options = "".join(
+            f"<option value='{deck_id}'>Archetype - Player {deck_id}</option>"
+            for deck_id in out_decks[start : start + 8]
+        )
+        label = f"#{start + 9}-{start + 16}"
+        groups.append(f"<optgroup label='{label}'>{options}</optgroup>")
+
+    return (
+        f"<html><head><title>{name}</title></head><body>"
+        f"<div class='event_title'>{name} @ {html.escape(event['place'])}</div>"
+        "<div class='event_meta'>"
+        f"<div class='meta_arch'>{event['format']}</div>"
+        f"<div>{event['players']} players - {event['date']}</div>"
+        "</div>"
+        + "".join(blocks)
+        + f"<select>{''.join(groups)}</select>"
+        + "</body></html>"
+    )
+
+
+def build_fixtures(directory: Path, scale: str = "small", seed: int = 2695) -> dict:
+    """Écriture des fixtures dans le dossier, sauf si elles y sont déjà.
+
+    Retourne le manifeste qui décrit les événements et les résultats attendus.
+    """
+
+    directory = Path(directory)
+    manifest_path = directory / "manifest.json"
+    if manifest_path.is_file():
+        manifest = json.loads(manifest_path.read_text())
+        if (manifest["version"], manifest["scale"], manifest["seed"]) == (
+            FIXTURES_VERSION,
+            scale,
+            seed,
+        ):
+            return manifest
+
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    config = SCALES[scale]
+
+    set_list = _set_list(rng, config["sets"])
+    set_codes = [item["code"] for item in set_list["data"]]
+    cards, commanders, playables = _catalog(rng, config["cards"], set_codes)
+    with gzip.open(directory / "SetList.json.gz", "wt", encoding="utf-8") as file:
+        json.dump(set_list, file)
+    with gzip.open(directory / "AtomicCards.json.gz", "wt", encoding="utf-8") as file:
+        json.dump(cards, file)
+
+    manifest = {
+        "version": FIXTURES_VERSION,
+        "scale": scale,
+        "seed": seed,
+        "cards": len(cards["data"]),
+        "parse_events": {},
+        "scrap_events": [],
+        "expected": {"stored": 0, "rejected": 0, "decks": 0},
+        "sample_decks": [],
+        "lookups": [],
+    }
+
+    def write_event(event_id: int, event: dict, nb_decks: int, rejected: bool):
+        deck_ids = [event_id * 1000 + index for index in range(nb_decks)]
+        for deck_id in deck_ids:
+            export = _mtgo_export(rng, commanders, playables)
+            if rejected and deck_id == deck_ids[-1]:
+                # Sans sideboard, le commandant est inconnu : tournoi annulé
+                export = export.split("Sideboard")[0]
+            (directory / f"mtgo-{deck_id}.txt").write_bytes(export.encode(ENCODING))
+            if len(manifest["lookups"]) < 5000:
+                manifest["lookups"] += [
+                    line.split(" ", maxsplit=1)[1]
+                    for line in export.split("\r\n")
+                    if " " in line
+                ]
+        page = _event_page(event_id, event, deck_ids)
+        (directory / f"event-{event_id}.html").write_bytes(page.encode(ENCODING))
+        return deck_ids
+
+    day = date(2023, 1, 7)
+    for nb_decks in EVENT_SIZES:
+        event = {
+            "name": f"Benchmark Open {nb_decks}",
+            "place": "Lyon",
+            "format": "Duel Commander",
+            "players": nb_decks + 3,
+            "date": day.strftime("%d/%m/%y"),
+        }
+        deck_ids = write_event(PARSE_EVENT + nb_decks, event, nb_decks, False)
+        manifest["parse_events"][str(nb_decks)] = PARSE_EVENT + nb_decks
+        manifest["sample_decks"] += deck_ids[:8]
+
+    for index in range(config["events"]):
+        event_id = FIRST_EVENT + 1 + index
+        day += timedelta(days=7)
+        if index % 9 == 8:
+            continue  # Pas de page pour cet id
+
+        nb_decks = SCRAP_SIZES[index % len(SCRAP_SIZES)]
+        duel = index % 4 != 3
+        rejected = duel and index % 7 == 6
+        event = {
+            "name": f"Benchmark Weekly #{index}",
+            "place": "Bordeaux" if index % 2 else "Île-de-France",
+            "format": "Duel Commander" if duel else "Legacy",
+            "players": nb_decks * 2,
+            "date": day.strftime("%d/%m/%y"),
+        }
+        write_event(event_id, event, nb_decks, rejected)
+        manifest["scrap_events"].append(event_id)
+        if duel and rejected:
+            manifest["expected"]["rejected"] += 1
+        elif duel:
+            manifest["expected"]["stored"] += 1
+            manifest["expected"]["decks"] += nb_decks
+
+    manifest["span"] = config["events"]
+    manifest_path.write_text(json.dumps(manifest))
+    return manifest
+
+
+# Tables des cartes par deck selon le type de clé des cartes : uuid MTGJSON
+# (schéma d'origine) ou entier (clé de substitution, oracle_id à part)
+KEY_LAYOUTS = {
+    "text": [
+        """CREATE TABLE cartes (
+            id VARCHAR NOT NULL PRIMARY KEY,
+            name VARCHAR NOT NULL
+        )""",
+        """CREATE TABLE decks_cartes (
+            deck_id INTEGER NOT NULL,
+            carte_id VARCHAR NOT NULL REFERENCES cartes (id),
+            quantite INTEGER NOT NULL,
+            PRIMARY KEY (deck_id, carte_id)
+        )""",
+        """CREATE TABLE decks_commanders (
+            deck_id INTEGER NOT NULL,
+            carte_id VARCHAR NOT NULL REFERENCES cartes (id),
+            PRIMARY KEY (deck_id, carte_id)
+        )""",
+    ],
+    "integer": [
+        """CREATE TABLE cartes (
+            id INTEGER NOT NULL PRIMARY KEY,
+            oracle_id VARCHAR NOT NULL UNIQUE,
+            name VARCHAR NOT NULL
+        )""",
+        """CREATE TABLE decks_cartes (
+            deck_id INTEGER NOT NULL,
+            carte_id INTEGER NOT NULL REFERENCES cartes (id),
+            quantite INTEGER NOT NULL,
+            PRIMARY KEY (deck_id, carte_id)
+        )""",
+        """CREATE TABLE decks_commanders (
+            deck_id INTEGER NOT NULL,
+            carte_id INTEGER NOT NULL REFERENCES cartes (id),
+            PRIMARY KEY (deck_id, carte_id)
+        )""",
+    ],
+}
+KEYS_USAGE = """SELECT cartes.name, count(*) FROM decks_cartes
+    JOIN cartes ON cartes.id = decks_cartes.carte_id GROUP BY cartes.id"""
+KEYS_DECKLISTS = """SELECT deck_id, cartes.name, quantite FROM decks_cartes
+    JOIN cartes ON cartes.id = decks_cartes.carte_id WHERE deck_id IN (%s)"""
+KEYS_SAMPLE = 200  # Decks lus par la requête de decklists
+
+
+def build_key_layout(path: Path, layout: str, scale: str, seed: int = 2695) -> int:
+    """Base synthétique des cartes par deck avec le type de clé `layout`.
+
+    Les mêmes cartes et decks (graine fixe) sont écrits quel que soit le type de
+    clé ; la base est compactée, sa taille en octets est retournée.
+    """
+
+    config = SCALES[scale]
+    rng = random.Random(seed)
+    oracle_ids = [
+        str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(config["cards"])
+    ]
+    keys = oracle_ids if layout == "text" else range(1, config["cards"] + 1)
+    keys = list(keys)
+
+    connection = sqlite3.connect(path)
+    for statement in KEY_LAYOUTS[layout]:
+        connection.execute(statement)
+    if layout == "text":
+        cartes = [(key, f"Card {index}") for index, key in enumerate(keys)]
+        connection.executemany("INSERT INTO cartes VALUES (?, ?)", cartes)
+    else:
+        cartes = [(key, oracle_ids[key - 1], f"Card {key - 1}") for key in keys]
+        connection.executemany("INSERT INTO cartes VALUES (?, ?, ?)", cartes)
+
+    for deck_id in range(1, config["decks"] + 1):
+        cards = rng.sample(keys, 100)
+        connection.execute(
+            "INSERT INTO decks_commanders VALUES (?, ?)", (deck_id, cards[0])
+        )
+        connection.executemany(
+            "INSERT INTO decks_cartes VALUES (?, ?, 1)",
+            [(deck_id, card) for card in cards[1:]],
+        )
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+    return path.stat().st_size
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Réponses de mtgtop8 : pages d'événements, de decks et exports MTGO."""
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/event" and "d" in query:
+            body = f"<html><body><div class='deck'>{query['d']}</div></body></html>"
+            body = body.encode(ENCODING)
+        elif url.path == "/event" and "e" in query:
+            body = self.server.pages.get(f"event-{query['e']}.html")
+            body = EMPTY_EVENT.encode(ENCODING) if body is None else body
+        elif url.path == "/mtgo" and "d" in query:
+            body = self.server.pages.get(f"mtgo-{query['d']}.txt")
+        else:
+            body = None
+
+        if body is None:
+            self.send_error(404)
+            return
+
+        content_type = "text/plain" if url.path == "/mtgo" else "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset={ENCODING}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        """Pas de journal par requête."""
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # Chaque tournoi ouvre une connexion par deck
+
+
+class LocalMtgTop8:
+    """Serveur HTTP local qui sert les fixtures à la place de mtgtop8."""
+
+    def __init__(self, directory: Path) -> None:
+        self.pages = {
+            path.name: path.read_bytes()
+            for pattern in ("event-*.html", "mtgo-*.txt")
+            for path in Path(directory).glob(pattern)
+        }
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """Adresse à utiliser à la place de https://mtgtop8.com."""
+
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        """Démarrage du serveur dans un thread."""
+
+        self.server = _Server(("127.0.0.1", 0), _Handler)
+        self.server.pages = self.pages
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Arrêt du serveur."""
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def load_mtgjson(cls, path: Path):
+    """Instance AllSets ou AllCards chargée depuis un fichier local."""
+
+    loader = cls.__new__(cls)
+    loader.path = Path(path)
+    loader.progress = None
+    loader.data = json.load(gzip.open(path))["data"]
+    return loader
+
+
+def ingest_fixtures(fixtures: Path, db_path: Path) -> None:
+    """Création d'une base avec les sets et cartes des fixtures."""
+
+    mtgdc_database.DB_PATH = Path(db_path)
+    load_mtgjson(AllSets, Path(fixtures) / "SetList.json.gz")._upgrade()
+    load_mtgjson(AllCards, Path(fixtures) / "AtomicCards.json.gz")._upgrade()
+
+
+def _check(condition: bool, message: str) -> None:
+    """Une mesure sur un résultat faux n'a pas de valeur : elle est signalée."""
+
+    if not condition:
+        raise RuntimeError(message)
+
+
+class Benchmark:
+    """Cas de benchmark sur les fixtures servies par le serveur local.
+
+    Chaque cas retourne (durée mesurée, nombre d'éléments traités, détails).
+    """
+
+    def __init__(self, fixtures: Path, work: Path, manifest: dict) -> None:
+        self.fixtures = Path(fixtures)
+        self.work = Path(work)
+        self.manifest = manifest
+        self.template = self.work / "template.sqlite"
+        self.url = None
+        self.runs = 0
+
+    def setup(self, url: str) -> None:
+        """Base de référence et branchement du scrapper sur le serveur local."""
+
+        self.url = url
+        ingest_fixtures(self.fixtures, self.template)
+
+        # Import tardif : le catalogue est chargé depuis la base à l'import
+        import mtgdc_scrapper
+
+        mtgdc_scrapper.MTGTOP8 = url
+        mtgdc_scrapper.CARDS.helpers()
+
+    def cases(self) -> dict:
+        """Cas disponibles, par nom."""
+
+        cases = {}
+        for size in EVENT_SIZES:
+            cases[f"tournoi[{size}]"] = partial(self.tournoi, size)
+        for size in EVENT_SIZES:
+            cases[f"tournoi_decks[{size}]"] = partial(self.tournoi_decks, size)
+        cases["deck"] = self.deck
+        cases["cards_get"] = self.cards_get
+        cases["catalog_build"] = self.catalog_build
+        cases["catalog_refresh"] = self.catalog_refresh
+        cases["cards_ingest"] = self.cards_ingest
+        cases["card_keys[text]"] = partial(self.card_keys, "text")
+        cases["card_keys[integer]"] = partial(self.card_keys, "integer")
+        cases["scrap_run"] = self.scrap_run
+        cases["scrap_run_pool"] = partial(self.scrap_run, PARSE_PROCESSES)
+        return cases
+
+    def _fresh_database(self, name: str) -> Path:
+        """Nouveau fichier de base, distinct à chaque run."""
+
+        self.runs += 1
+        return self.work / f"{name}-{self.runs}.sqlite"
+
+    def tournoi(self, size: int) -> tuple:
+        """Page d'événement : téléchargement, parsing et métadonnées."""
+
+        from mtgdc_scrapper import MTGTournoi
+
+        event_id = self.manifest["parse_events"][str(size)]
+        start = time.perf_counter()
+        tournament = MTGTournoi(f"{self.url}/event?e={event_id}")
+        metadata = (tournament.is_commander, tournament.name, tournament.players)
+        refs = tournament.record["decks"]
+        elapsed = time.perf_counter() - start
+
+        _check(metadata == (True, f"Benchmark Open {size}", size + 3), "métadonnées")
+        _check(len(refs) == size, f"{len(refs)} decks trouvés au lieu de {size}")
+        return elapsed, size, {}
+
+    def tournoi_decks(self, size: int) -> tuple:
+        """Extraction de toutes les decklists d'un événement."""
+
+        from mtgdc_scrapper import MTGTournoi
+
+        event_id = self.manifest["parse_events"][str(size)]
+        tournament = MTGTournoi(f"{self.url}/event?e={event_id}")
+        start = time.perf_counter()
+        decks = tournament.decks
+        elapsed = time.perf_counter() - start
+
+        _check(len(decks) == size, f"{len(decks)} decks extraits au lieu de {size}")
+        return elapsed, size, {}
+
+    def deck(self) -> tuple:
+        """Extraction de decklists une à une (commandant et mainboard)."""
+
+        from mtgdc_scrapper import MTGDeck
+
+        deck_ids = self.manifest["sample_decks"]
+        start = time.perf_counter()
+        for deck_id in deck_ids:
+            deck = MTGDeck(deck_id)
+            _check(len(deck.commander) == 1 and deck.mainboard, f"deck {deck_id}")
+        return time.perf_counter() - start, len(deck_ids), {}
+
+    def cards_get(self) -> tuple:
+        """Résolution des noms de cartes tels que scrappés."""
+
+        cards = DBCards()
+        names = self.manifest["lookups"]
+        start = time.perf_counter()
+        found = sum(1 for name in names if cards.get(name))
+        elapsed = time.perf_counter() - start
+
+        _check(found == len(names), f"{len(names) - found} noms non résolus")
+        return elapsed, len(names), {}
+
+    def catalog_build(self) -> tuple:
+        """Construction complète du catalogue `DBCards`."""
+
+        start = time.perf_counter()
+        cards = DBCards()
+        elapsed = time.perf_counter() - start
+        return elapsed, len(cards.helper), {}
+
+    def catalog_refresh(self) -> tuple:
+        """`DBCards.helpers` sur un catalogue chargé, comme au début d'un run."""
+
+        cards = DBCards()
+        start = time.perf_counter()
+        cards.helpers()
+        elapsed = time.perf_counter() - start
+
+        _check(len(cards.helper) == self.manifest["cards"] - 2, "catalogue incomplet")
+        return elapsed, len(cards.helper), {}
+
+    def cards_ingest(self) -> tuple:
+        """Ingestion du fichier AtomicCards dans une base vide."""
+
+        previous = mtgdc_database.DB_PATH
+        mtgdc_database.DB_PATH = self._fresh_database("ingest")
+        try:
+            load_mtgjson(AllSets, self.fixtures / "SetList.json.gz")._upgrade()
+            loader = load_mtgjson(AllCards, self.fixtures / "AtomicCards.json.gz")
+            start = time.perf_counter()
+            loader._upgrade()
+            elapsed = time.perf_counter() - start
+        finally:
+            mtgdc_database.DB_PATH = previous
+
+        return elapsed, len(loader.data), {}
+
+    def card_keys(self, layout: str) -> tuple:
+        """Jointure des cartes par deck selon le type de clé des cartes.
+
+        Mesure l'usage de toutes les cartes (GROUP BY sur tous les decks) ;
+        les détails donnent la taille de la base et la lecture de
+        `KEYS_SAMPLE` decklists. La base est construite au premier appel.
+        """
+
+        path = self.work / f"keys-{layout}.sqlite"
+        if not path.exists():
+            build_key_layout(path, layout, self.manifest["scale"])
+
+        connection = sqlite3.connect(path)
+        start = time.perf_counter()
+        usage = connection.execute(KEYS_USAGE).fetchall()
+        elapsed = time.perf_counter() - start
+
+        deck_ids = ", ".join(str(deck_id) for deck_id in range(1, KEYS_SAMPLE + 1))
+        start = time.perf_counter()
+        rows = connection.execute(KEYS_DECKLISTS % deck_ids).fetchall()
+        decklists = time.perf_counter() - start
+        connection.close()
+
+        _check(len(rows) == 99 * KEYS_SAMPLE, f"{len(rows)} lignes de decklists")
+        return (
+            elapsed,
+            len(usage),
+            {
+                "db_mb": path.stat().st_size / (1 << 20),
+                "decklists_ms": 1000 * decklists,
+            },
+        )
+
+    def scrap_run(self, processes: int = 0) -> tuple:
+        """Run complet de `scrap_mtgtop8` sur une copie de la base de référence.
+
+        Avec `processes`, le parsing est fait par un pool de processus.
+        """
+
+        from mtgdc_scrapper import scrap_mtgtop8
+
+        previous = mtgdc_database.DB_PATH
+        mtgdc_database.DB_PATH = self._fresh_database("scrap")
+        shutil.copyfile(self.template, mtgdc_database.DB_PATH)
+        METRICS.reset()
+        try:
+            start = time.perf_counter()
+            stats = scrap_mtgtop8(
+                self.manifest["span"], from_id=FIRST_EVENT, processes=processes
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            mtgdc_database.DB_PATH = previous
+
+        expected = self.manifest["expected"]
+        _check(stats["failures"] == 0, f"erreurs : {stats['errors'][:3]}")
+        _check(
+            (stats["stored"], stats["rejected"], stats["decks"])
+            == (expected["stored"], expected["rejected"], expected["decks"]),
+            f"résultat inattendu : {stats}",
+        )
+
+        # Durée moyenne de chaque étape instrumentée
+        stages = {
+            name: metric["mean"]
+            for name, metric in METRICS.to_dict().items()
+            if metric["type"] == "histogram"
+        }
+        return elapsed, stats["decks"], {"stages": stages}
+
+
+def measure(case, repeats: int) -> dict:
+    """Répétition d'un cas et statistiques des durées."""
+
+    timings = []
+    details = {}
+    for _ in range(repeats):
+        elapsed, items, details = case()
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    return {
+        "repeats": repeats,
+        "median": median,
+        "min": min(timings),
+        "max": max(timings),
+        "items": items,
+        "items_per_sec": items / median if median else 0.0,
+        **details,
+    }
+
+
+def run_benchmarks(
+    scale: str = "small",
+    repeats: int = 3,
+    only: list = None,
+    fixtures: Path = None,
+    report=None,
+) -> dict:
+    """Exécution des cas demandés (tous par défaut).
+
+    `fixtures` permet de conserver les fixtures entre deux exécutions ;
+    `report` reçoit (nom du cas, résultat) après chaque cas.
+    """
+
+    work = Path(tempfile.mkdtemp(prefix="barrins-bench-"))
+    fixtures = Path(fixtures) if fixtures else work / "fixtures"
+    previous = mtgdc_database.DB_PATH
+
+    results = {
+        "meta": {
+            "scale": scale,
+            "repeats": repeats,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "cases": {},
+    }
+    try:
+        manifest = build_fixtures(fixtures, scale)
+        benchmark = Benchmark(fixtures, work, manifest)
+        with LocalMtgTop8(fixtures) as server:
+            benchmark.setup(server.url)
+            for name, case in benchmark.cases().items():
+                if only and name not in only and name.split("[")[0] not in only:
+                    continue
+                try:
+                    result = measure(case, repeats)
+                except Exception as error:
+                    result = {"error": repr(error)}
+                results["cases"][name] = result
+                if report:
+                    report(name, result)
+    finally:
+        mtgdc_database.DB_PATH = previous
+        shutil.rmtree(work, ignore_errors=True)
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.25) -> list:
+    """Cas dont la durée médiane dépasse la référence de plus de `tolerance`."""
+
+    if results["meta"]["scale"] != baseline["meta"]["scale"]:
+        raise ValueError(
+            f"Échelles différentes : {results['meta']['scale']}"
+            + f" et {baseline['meta']['scale']}"
+        )
+
+    regressions = []
+    for name, result in results["cases"].items():
+        reference = baseline["cases"].get(name, {})
+        if "median" not in result or "median" not in reference:
+            continue
+        ratio = result["median"] / reference["median"] if reference["median"] else 0
+        if ratio > 1 + tolerance:
+            regressions.append(
+                {
+                    "case": name,
+                    "median": result["median"],
+                    "baseline": reference["median"],
+                    "ratio": ratio,
+                }
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    for case_name, case_result in run_benchmarks()["cases"].items():
+        print(f"{case_name}: {case_result}")
@@ -0,0 +1,190 @@
+"""Module de pagination des tournois en base."""
+
+from datetime import date, timedelta
+
+from mtgdc_database import Tournois, init_database
+from sqlalchemy import func, select, tuple_
+
+SORT_COLUMNS = {
+    "id": Tournois.id,
+    "name": Tournois.name,
+    "date": Tournois.date,
+    "players": Tournois.players,
+}
+
+
+class TournamentBrowser:
+    """Parcours des tournois par pages, trié et paginé par la base.
+
+    La pagination se fait par clé (valeur de tri, id) plutôt que par OFFSET :
+    chaque page est une lecture d'index, quelle que soit sa position.
+    """
+
+    def __init__(self, page_size: int = 100) -> None:
+        self.page_size = page_size
+        self.first_key = None
+        self.last_key = None
+        self.has_previous = False
+        self.has_next = False
+
+        self._sort = "id"
+        self.descending = True
+
+    @property
+    def sort(self) -> str:
+        """Nom de la colonne de tri courante."""
+
+        return self._sort
+
+    @sort.setter
+    def sort(self, sort: str) -> None:
+        """Changement de tri : les clés de la page ne valent plus pour ce tri."""
+
+        if sort != self._sort:
+            self.first_key = None
+            self.last_key = None
+            self.has_previous = False
+            self.has_next = False
+        self._sort = sort
+
+    @property
+    def column(self):
+        """Colonne de tri courante."""
+
+        return SORT_COLUMNS[self.sort]
+
+    def count(self) -> int:
+        """Nombre total de tournois en base."""
+
+        session = init_database()
+        total = session.execute(select(func.count()).select_from(Tournois)).scalar()
+        session.close()
+        return total
+
+    def position(self) -> int:
+        """Nombre de tournois qui précèdent la page courante."""
+
+        if self.first_key is None:
+            return 0
+
+        session = init_database()
+        stmt = (
+            select(func.count())
+            .select_from(Tournois)
+            .where(self._after(self.first_key, not self.descending))
+        )
+        before = session.execute(stmt).scalar()
+        session.close()
+        return before
+
+    def sort_by(self, sort: str) -> list:
+        """Tri selon la colonne, dans l'autre sens si elle est déjà triée."""
+
+        if sort == self.sort:
+            self.descending = not self.descending
+        else:
+            self.sort = sort
+            self.descending = sort != "name"
+        return self.first_page()
+
+    def first_page(self) -> list:
+        """Première page selon le tri courant."""
+
+        return self._fetch(None, forward=True)
+
+    def next_page(self) -> list:
+        """Page suivante (la page courante si c'est la dernière)."""
+
+        if not self.has_next:
+            return self._fetch(self.first_key, forward=True, inclusive=True)
+        return self._fetch(self.last_key, forward=True)
+
+    def page_after(self, key: tuple) -> list:
+        """Page qui suit la clé (valeur de tri, id) selon le tri courant."""
+
+        return self._fetch(key, forward=True)
+
+    def previous_page(self) -> list:
+        """Page précédente (la première page si c'est déjà le début)."""
+
+        if not self.has_previous:
+            return self.first_page()
+        return self._fetch(self.first_key, forward=False)
+
+    def jump_to_date(self, day: date) -> list:
+        """Page commençant au premier tournoi à partir de la date, selon le sens."""
+
+        self.sort = "date"
+        if self.descending:
+            return self._fetch((day + timedelta(days=1), 0), forward=True)
+        return self._fetch((day, 0), forward=True)
+
+    def _after(self, key: tuple, descending: bool):
+        """Condition « strictement après la clé » dans le sens donné."""
+
+        columns = tuple_(self.column, Tournois.id)
+        if descending:
+            return columns < tuple_(*key)
+        return columns > tuple_(*key)
+
+    def _exists(self, condition) -> bool:
+        """Existe-t-il au moins un tournoi qui vérifie la condition ?"""
+
+        session = init_database()
+        found = session.execute(select(Tournois.id).where(condition).limit(1)).first()
+        session.close()
+        return found is not None
+
+    def _fetch(self, key, forward: bool, inclusive: bool = False) -> list:
+        """Lecture d'une page à partir d'une clé, vers l'avant ou l'arrière."""
+
+        descending = self.descending if forward else not self.descending
+        order = (
+            (self.column.desc(), Tournois.id.desc())
+            if descending
+            else (self.column.asc(), Tournois.id.asc())
+        )
+
+        stmt = select(
+            Tournois.id, Tournois.name, Tournois.date, Tournois.players
+        ).order_by(*order)
+        if key is not None:
+            condition = self._after(key, descending)
+            if inclusive:
+                condition = condition | (
+                    tuple_(self.column, Tournois.id) == tuple_(*key)
+                )
+            stmt = stmt.where(condition)
+
+        session = init_database()
+        # Une ligne de plus pour savoir s'il reste des tournois après la page
+        rows = session.execute(stmt.limit(self.page_size + 1)).all()
+        session.close()
+
+        more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if not forward:
+            rows.reverse()
+
+        if len(rows) == 0:
+            # Page vide : la clé demandée sert de repère pour repartir en arrière
+            # (ou en avant) vers les tournois qui existent de l'autre côté
+            self.first_key = self.last_key = key
+            others = key is not None and self._exists(self._after(key, not descending))
+            self.has_previous = others if forward else False
+            self.has_next = False if forward else others
+            return rows
+
+        self.first_key = (getattr(rows[0], self.sort), rows[0].id)
+        self.last_key = (getattr(rows[-1], self.sort), rows[-1].id)
+        if forward:
+            # Une clé ne suffit pas : elle peut précéder le premier tournoi
+            self.has_previous = key is not None and self._exists(
+                self._after(self.first_key, not descending)
+            )
+            self.has_next = more
+        else:
+            self.has_previous = more
+            self.has_next = True
+
+        return rows
@@ -2,14 +2,32 @@
 
 import gzip
 import json
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 
 import requests
 import sqlalchemy
-from mtgdc_database import Cartes, IntegrityError, Sets, init_database
+from mtgdc_database import (
+    Cartes,
+    IntegrityError,
+    Sets,
+    card_flags,
+    cartes_alias,
+    format_bit,
+    init_database,
+    rebuild_search_index,
+)
+from sqlalchemy import func, insert, select, text
 from unidecode import unidecode
 
+DOWNLOAD_CHUNK = 1 << 20
+REPORT_EVERY = 500  # Entrées traitées entre deux événements d'avancement
+CACHE_SIZE = 20000  # Noms scrappés gardés en mémoire par le cache de résolution
+MISSING = object()
+
 
 class MTGJSON:
     """Gestion de base de la récupération des fichiers de MTGJSON."""
@@ -17,6 +35,13 @@ class MTGJSON:
     target = ""
     path = Path()
     data = {}
+    progress = None
+
+    def _report(self, stage: str, **values) -> None:
+        """Transmission d'un événement d'avancement au callback éventuel."""
+
+        if self.progress:
+            self.progress({"stage": stage, "name": self.path.name, **values})
 
     @property
     def is_up_to_date(self):
@@ -32,19 +57,26 @@ class MTGJSON:
 
     def _download(self):
         response = requests.get(self.target, stream=True)
+        total = int(response.headers.get("Content-Length", 0))
+        done = 0
         with open(self.path, "wb") as file:
-            file.write(response.content)
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                file.write(chunk)
+                done += len(chunk)
+                self._report("download", done=done, total=total)
 
 
 class AllSets(MTGJSON):
     """Récupération et initialisation des données MTGJSON."""
 
-    def __init__(self) -> None:
+    def __init__(self, progress=None) -> None:
         self.target = "https://mtgjson.com/api/v5/SetList.json.gz"
         self.path = Path(__file__).parent / "AllSets.json.gz"
+        self.progress = progress
 
         if not self.is_up_to_date:
             self._download()
+            self._report("load")
             self.data = json.load(gzip.open(self.path))["data"]
             self._upgrade()
 
@@ -52,8 +84,14 @@ class AllSets(MTGJSON):
         """Mise à jour de la base."""
 
         session = init_database()
+        written = 0
+
+        for index, set_data in enumerate(self.data):
+            if index % REPORT_EVERY == 0:
+                self._report(
+                    "upgrade", done=index, total=len(self.data), written=written
+                )
 
-        for set_data in self.data:
             # Vérifier si le set existe déjà dans la base de données
             existing_set = session.query(Sets).filter_by(code=set_data["code"]).first()
             if existing_set:
@@ -68,6 +106,7 @@ class AllSets(MTGJSON):
             session.add(new_set)
             try:
                 session.commit()
+                written += 1
             except sqlalchemy.exc.IntegrityError:
                 session.rollback()
                 print(
@@ -76,16 +115,22 @@ class AllSets(MTGJSON):
                     "à la base de données.",
                 )
 
+        self._report(
+            "upgrade", done=len(self.data), total=len(self.data), written=written
+        )
+
 
 class AllCards(MTGJSON):
     """Récupération et initialisation des données MTGJSON."""
 
-    def __init__(self) -> None:
+    def __init__(self, progress=None) -> None:
         self.target = "https://mtgjson.com/api/v5/AtomicCards.json.gz"
         self.path = Path(__file__).parent / "AtomicCards.json.gz"
+        self.progress = progress
 
         if not self.is_up_to_date:
             self._download()
+            self._report("load")
             self.data = json.load(gzip.open(self.path))["data"]
             self._upgrade()
 
@@ -93,8 +138,14 @@ class AllCards(MTGJSON):
         """Mise à jour de la base."""
 
         session = init_database()
+        written = 0
+
+        for index, card_name in enumerate(self.data.keys()):
+            if index % REPORT_EVERY == 0:
+                self._report(
+                    "upgrade", done=index, total=len(self.data), written=written
+                )
 
-        for card_name in self.data.keys():
             card_data = self.data[card_name][0]
 
             # Vérifier si ce n'est pas une carte Archenemy
@@ -112,7 +163,7 @@ class AllCards(MTGJSON):
             # Vérifier si la carte existe déjà dans la base de données
             existing_card = (
                 session.query(Cartes)
-                .filter_by(id=card_data["identifiers"]["scryfallOracleId"])
+                .filter_by(oracle_id=card_data["identifiers"]["scryfallOracleId"])
                 .first()
             )
             if existing_card:
@@ -128,7 +179,7 @@ class AllCards(MTGJSON):
                 )
 
                 new_card = Cartes(
-                    id=card_data["identifiers"]["scryfallOracleId"],
+                    oracle_id=card_data["identifiers"]["scryfallOracleId"],
                     name=card_data["name"],
                     type=card_data["type"],
                     mana_value=int(card_data["manaValue"]),
@@ -136,6 +187,12 @@ class AllCards(MTGJSON):
                     text=card_text,
                     first_print=first_print,
                     legalities=card_data["legalities"],
+                    **card_flags(
+                        card_data["name"],
+                        card_data["type"],
+                        card_text,
+                        card_data["legalities"],
+                    ),
                 )
                 session.add(new_card)
             except KeyError:
@@ -144,6 +201,7 @@ class AllCards(MTGJSON):
 
             try:
                 session.commit()
+                written += 1
             except IntegrityError:
                 session.rollback()
                 print(
@@ -152,6 +210,106 @@ class AllCards(MTGJSON):
                     "à la base de données.",
                 )
 
+        self._report(
+            "upgrade", done=len(self.data), total=len(self.data), written=written
+        )
+
+        # Resynchronisation de l'index plein texte des cartes
+        rebuild_search_index(session.connection())
+        session.commit()
+        session.close()
+
+
+@lru_cache(maxsize=65536)
+def clean_name(string: str) -> str:
+    """Nom réduit à ses lettres, sans accents ni majuscules."""
+
+    string = string.replace("&amp;", "")
+    return "".join(char for char in unidecode(string) if char.isalpha()).lower()
+
+
+def mangled_names(name: str) -> set:
+    """Variantes d'un nom accentué après une erreur d'encodage.
+
+    Par exemple "Lim-Dûl's Vault" lu en latin-1 depuis de l'UTF-8 devient
+    "Lim-DÃ»l's Vault", que la suppression des accents ne sait pas corriger.
+    """
+
+    if name.isascii():
+        return set()
+
+    variants = {name.encode("ascii", errors="replace").decode("ascii")}
+    for encoding in ("iso-8859-1", "cp1252"):
+        try:
+            variants.add(name.encode("utf-8").decode(encoding))
+        except UnicodeDecodeError:
+            continue
+    variants.discard(name)
+    return variants
+
+
+class ResolutionCache:
+    """Cache borné (LRU) des noms scrappés vers le nom canonique de la carte.
+
+    Les noms inconnus sont gardés (valeur None) jusqu'à la mise à jour du
+    catalogue, qui peut les rendre résolubles.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def get(self, raw_name: str):
+        """Nom canonique en cache, ou MISSING."""
+
+        with self.lock:
+            name = self.entries.get(raw_name, MISSING)
+            if name is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(raw_name)
+            return name
+
+    def put(self, raw_name: str, name) -> None:
+        """Ajout d'une résolution, en évinçant la plus ancienne si besoin."""
+
+        with self.lock:
+            self.entries[raw_name] = name
+            self.entries.move_to_end(raw_name)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def forget_unknown(self) -> None:
+        """Oubli des noms inconnus, après une mise à jour du catalogue."""
+
+        with self.lock:
+            for raw_name in [key for key, name in self.entries.items() if not name]:
+                del self.entries[raw_name]
+
+    def reset_stats(self) -> None:
+        """Remise à zéro des compteurs, par exemple au début d'un run."""
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        """Compteurs du cache."""
+
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
 
 class DBCards:
     """Classe qui gère les requêtes à la base concernant les cartes."""
@@ -159,38 +317,114 @@ class DBCards:
     def __init__(self) -> None:
         self.helper = {}
         self.clean_keys = {}
+        self.aliases = {}
+        self.names = {}  # Nom courant de chaque carte, par id
+        self.learned = {}  # Alias résolus pendant ce run, pas encore en base
+        self.version = None  # (nombre de cartes, estampille max) des helpers
+        self.cache = ResolutionCache()
         self.helpers()
 
-    def helpers(self) -> None:
-        """Procédure qui permet de recréer les helpers après un update."""
+    def helpers(self, full: bool = False) -> None:
+        """Procédure qui permet de recréer les helpers après un update.
 
-        session = init_database()
-        cards = session.query(Cartes).all()
-
-        self.helper = {
-            card.name: {
-                "id": card.id,
-                "name": card.name,
-                "type": card.type,
-                "mana_value": card.mana_value,
-                "color_identity": card.color_identity,
-                "text": card.text,
-                "first_print": card.first_print,
-                "legalities": card.legalities,
-            }
-            for card in cards
-        }
+        Seules les cartes ajoutées ou modifiées depuis l'appel précédent sont
+        relues ; `full` force la relecture de toute la table.
+        """
 
-        self.clean_keys = {
-            self._remove_accents(card_name): card_data
-            for card_name, card_data in self.helper.items()
+        session = init_database()
+        stmt = select(func.count(Cartes.id), func.max(Cartes.stamp))
+        version = tuple(session.execute(stmt).one())
+        if version == self.version and not full:
+            session.close()
+            return
+
+        # Une carte en moins ne se voit pas dans les estampilles
+        full = full or self.version is None or version[0] < self.version[0]
+        if full:
+            helper, clean_keys, aliases, names = {}, {}, {}, {}
+            cards = session.query(Cartes).all()
+        else:
+            # Copies : les threads du scrapper peuvent lire les helpers en cours
+            helper, clean_keys = dict(self.helper), dict(self.clean_keys)
+            aliases, names = dict(self.aliases), dict(self.names)
+            cards = session.query(Cartes).filter(Cartes.stamp > self.version[1])
+
+        for card in cards:
+            previous = names.get(card.id)
+            if previous is not None and previous != card.name:
+                helper.pop(previous, None)
+                clean_keys.pop(self._remove_accents(previous), None)
+
+            card_data = self._to_dict(card)
+            names[card.id] = card.name
+            helper[card.name] = card_data
+            clean_keys[self._remove_accents(card.name)] = card_data
+
+            # Alias connus : erreurs d'encodage des noms accentués
+            for variant in mangled_names(card.name):
+                aliases[variant] = card.name
+
+        # Puis noms déjà résolus lors des runs précédents
+        stmt = select(cartes_alias.c.alias, Cartes.name).join(
+            Cartes, Cartes.id == cartes_alias.c.carte_id
+        )
+        aliases.update(dict(session.execute(stmt).all()))
+        aliases.update(self.learned)
+        session.close()
+
+        if len(names) != version[0] and not full:
+            # Écriture concurrente ou estampilles incohérentes : relecture complète
+            self.version = None
+            self.helpers(full=True)
+            return
+
+        self.helper, self.clean_keys = helper, clean_keys
+        self.aliases, self.names = aliases, names
+        self.version = version
+        self.cache.forget_unknown()
+
+    def save_aliases(self) -> int:
+        """Enregistrement en base des alias résolus depuis le dernier appel."""
+
+        learned = dict(self.learned)
+        rows = [
+            {"alias": alias, "carte_id": self.helper[name]["id"]}
+            for alias, name in learned.items()
+            if name in self.helper
+        ]
+        if rows:
+            session = init_database()
+            session.execute(insert(cartes_alias).prefix_with("OR IGNORE"), rows)
+            session.commit()
+            session.close()
+
+        for alias in learned:
+            self.learned.pop(alias, None)
+        return len(rows)
+
+    def _to_dict(self, card: Cartes) -> dict:
+        """Représentation en dict d'une carte de la base."""
+
+        return {
+            "id": card.id,
+            "oracle_id": card.oracle_id,
+            "name": card.name,
+            "type": card.type,
+            "mana_value": card.mana_value,
+            "color_identity": card.color_identity,
+            "text": card.text,
+            "first_print": card.first_print,
+            "legalities": card.legalities,
+            "can_lead": card.can_lead,
+            "dc_legal": card.dc_legal,
+            "dc_restricted": card.dc_restricted,
+            "legal_formats": card.legal_formats,
         }
 
     def _remove_accents(self, string: str) -> str:
         """Méthode statique qui retourne une chaine contenant uniquement des lettres."""
 
-        string = string.replace("&amp;", "")
-        return "".join(char for char in unidecode(string) if char.isalpha()).lower()
+        return clean_name(string)
 
     def get(self, card_name: str) -> dict:
         """Récupération et contrôle des clés utilisées."""
@@ -198,22 +432,73 @@ class DBCards:
         if card_name == "Unknown Card":
             return {"name": "Unknown Card"}
 
-        if card_name in self.helper.keys():
-            return self.helper.get(card_name)
+        name = self.cache.get(card_name)
+        if name is MISSING:
+            name = self._resolve(card_name)
+            self.cache.put(card_name, name)
 
-        card_name = self._remove_accents(card_name)
-        if card_name in self.clean_keys.keys():
-            return self.clean_keys.get(card_name)
+        return self.helper.get(name, {}) if name else {}
 
-        possible_keys = [
-            value
-            for key, value in self.clean_keys.items()
-            if key.startswith(card_name) and " // " in value["name"]
-        ]
-        if len(possible_keys) == 1:
-            return possible_keys[0]
+    def _resolve(self, card_name: str) -> str:
+        """Nom canonique d'un nom scrappé (None s'il est inconnu)."""
+
+        if card_name in self.helper.keys():
+            return card_name
+
+        if card_name in self.aliases.keys():
+            return self.aliases[card_name]
+
+        clean_key = self._remove_accents(card_name)
+        if clean_key in self.clean_keys.keys():
+            name = self.clean_keys[clean_key]["name"]
+        else:
+            possible_keys = [
+                value
+                for key, value in self.clean_keys.items()
+                if key.startswith(clean_key) and " // " in value["name"]
+            ]
+            if len(possible_keys) != 1:
+                return None
+            name = possible_keys[0]["name"]
+
+        self.aliases[card_name] = name
+        self.learned[card_name] = name
+        return name
+
+    def search(self, query: str, field: str = None, limit: int = 20) -> list:
+        """Recherche plein texte des cartes, triée par pertinence.
+
+        `field` restreint la recherche à "name", "type" ou "text".
+        """
+
+        if field not in (None, "name", "type", "text"):
+            raise ValueError(f"Champ de recherche inconnu : {field}")
+
+        # Chaque mot est cherché tel quel (et en préfixe), sans syntaxe FTS5
+        terms = " ".join('"' + word.replace('"', '""') + '"*' for word in query.split())
+        if len(terms) == 0:
+            return []
+        if field:
+            terms = f"{field} : ({terms})"
+
+        session = init_database()
+        stmt = text(
+            "SELECT cartes.* FROM cartes_fts"
+            " JOIN cartes ON cartes.rowid = cartes_fts.rowid"
+            " WHERE cartes_fts MATCH :terms"
+            " ORDER BY bm25(cartes_fts, 10.0, 2.0, 1.0)"
+            " LIMIT :limit"
+        )
+        cards = (
+            session.query(Cartes)
+            .from_statement(stmt)
+            .params(terms=terms, limit=limit)
+            .all()
+        )
+        response = [self._to_dict(card) for card in cards]
+        session.close()
 
-        return {}
+        return response
 
     def has_leadership(self, card) -> bool:
         """Méthode pour savoir si la carte aurait pu être commander."""
@@ -221,41 +506,45 @@ class DBCards:
         if isinstance(card, str):
             card = self.get(card)
 
-        if card["name"].startswith("A-"):
-            return False
+        return bool(card.get("can_lead", False))
 
-        if "legendary" not in card["type"].lower():
-            return False
+    def is_commander(self, card) -> bool:
+        """Méthode pour savoir si la carte est actuellement commander."""
 
-        if (
-            "creature" not in card["type"].lower()
-            and "can be your commander" not in card["text"].lower()
-        ):
-            return card["name"].startswith("Grist, the Hunger Tide")
+        if isinstance(card, str):
+            card = self.get(card)
 
-        return True
+        return self.has_leadership(card) and not card["dc_restricted"]
 
-    def is_commander(self, card) -> bool:
-        """Méthode pour savoir si la carte est actuellement commander."""
+    def is_legal(self, card, format_name: str = "duel") -> bool:
+        """Méthode pour savoir si la carte est jouable dans le format."""
 
         if isinstance(card, str):
             card = self.get(card)
 
-        if not self.has_leadership(card):
-            return False
+        return bool(card.get("legal_formats", 0) & format_bit(format_name))
 
-        legalities = card["legalities"]
-        if "duel" in legalities.keys() and legalities["duel"] == "Restricted":
-            return False
+    def legal_commanders(self) -> list:
+        """Liste des commandants légaux en Duel Commander (parcours d'index)."""
 
-        return True
+        session = init_database()
+        cards = (
+            session.query(Cartes)
+            .filter(Cartes.can_lead.is_(True))
+            .filter(Cartes.dc_legal.is_(True))
+            .filter(Cartes.dc_restricted.is_(False))
+            .order_by(Cartes.name)
+            .all()
+        )
+        response = [self._to_dict(card) for card in cards]
+        session.close()
+
+        return response
 
     def command_zone_to_str(self, cards: list) -> str:
         """Méthode qui retourne la command zone sous forme de string."""
 
-        return " + ".join(
-            [carte.name for carte in cards if self.has_leadership(carte.name)]
-        )
+        return " + ".join([carte.name for carte in cards if carte.can_lead])
 
 
 def oldest_set(set_codes):
@@ -278,15 +567,15 @@ def oldest_set(set_codes):
         set_codes[-1]
 
 
-def init_sets():
+def init_sets(progress=None):
     """Initialisation de la table de sets."""
 
-    sets = AllSets()
+    sets = AllSets(progress)
     return sets
 
 
-def init_cards():
+def init_cards(progress=None):
     """Initialisation de la table de cartes."""
 
-    cards = AllCards()
+    cards = AllCards(progress)
     return cards
@@ -0,0 +1,435 @@
+"""Module de la ligne de commande, pour utiliser l'application sans affichage."""
+
+import argparse
+import json
+import sys
+from datetime import date
+
+
+def parse_args(args: list) -> argparse.Namespace:
+    """Lecture des arguments de la ligne de commande."""
+
+    parser = argparse.ArgumentParser(prog="barrins_app")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scrape = commands.add_parser("scrape", help="scrap de mtgtop8 sans interface")
+    scrape.add_argument(
+        "--span", type=int, default=100, help="nombre de tournois visités par run"
+    )
+    scrape.add_argument(
+        "--concurrency", type=int, default=10, help="tournois visités en parallèle"
+    )
+    scrape.add_argument(
+        "--from-id",
+        type=int,
+        default=None,
+        help="visite les tournois après cet id (défaut : dernier tournoi en base)",
+    )
+    scrape.add_argument(
+        "--parse-processes",
+        type=int,
+        default=0,
+        help="processus dédiés au parsing des pages (défaut : parsing dans les"
+        + " threads de téléchargement)",
+    )
+    scrape.add_argument(
+        "--no-refresh",
+        action="store_true",
+        help="ne pas mettre à jour les données MTGJSON avant le scrap",
+    )
+    scrape.add_argument(
+        "--no-retry",
+        action="store_true",
+        help="ne pas relancer les tournois en échec des runs précédents",
+    )
+    scrape.add_argument(
+        "--until-exhausted",
+        action="store_true",
+        help="enchaîner les runs tant que de nouveaux tournois sont ajoutés",
+    )
+    scrape.add_argument(
+        "--metrics-format",
+        choices=["json", "prometheus"],
+        default="json",
+        help="format des métriques écrites à la fin de chaque run",
+    )
+    scrape.add_argument(
+        "--metrics-file",
+        default=None,
+        help="fichier des métriques (défaut : sortie standard pour json,"
+        + " sortie d'erreur pour prometheus)",
+    )
+
+    bench = commands.add_parser(
+        "bench", help="benchmark hors ligne sur des fixtures et un serveur local"
+    )
+    bench.add_argument(
+        "--scale",
+        choices=["small", "medium", "large"],
+        default="small",
+        help="taille des fixtures (nombre de cartes et de tournois)",
+    )
+    bench.add_argument(
+        "--repeats", type=int, default=3, help="exécutions de chaque cas"
+    )
+    bench.add_argument(
+        "--case",
+        action="append",
+        default=None,
+        help="cas à exécuter, par exemple scrap_run ou tournoi (répétable)",
+    )
+    bench.add_argument(
+        "--fixtures",
+        default=None,
+        help="dossier où conserver les fixtures (défaut : dossier temporaire)",
+    )
+    bench.add_argument(
+        "--output", default=None, help="fichier JSON des résultats complets"
+    )
+    bench.add_argument(
+        "--compare", default=None, help="résultats de référence (fichier JSON)"
+    )
+    bench.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="ralentissement toléré par rapport à la référence (0.25 = +25 %%)",
+    )
+
+    memory = commands.add_parser(
+        "memory", help="pics mémoire du rafraîchissement des cartes"
+    )
+    memory.add_argument(
+        "--scale",
+        action="append",
+        choices=["small", "medium", "large"],
+        default=None,
+        help="taille des fixtures mesurées (répétable, défaut : small et medium)",
+    )
+    memory.add_argument(
+        "--stage",
+        action="append",
+        choices=["json_load", "ingest", "catalog"],
+        default=None,
+        help="étape mesurée (répétable, défaut : toutes)",
+    )
+    memory.add_argument(
+        "--budgets",
+        default=None,
+        help="budgets en Mo (JSON : échelle -> étape -> traced_mb / rss_mb)",
+    )
+    memory.add_argument(
+        "--top", type=int, default=10, help="sites d'allocation rapportés par étape"
+    )
+    memory.add_argument(
+        "--output", default=None, help="fichier JSON des résultats complets"
+    )
+
+    retries = commands.add_parser(
+        "retries", help="file de relance des tournois en échec et cartes inconnues"
+    )
+    retries.add_argument(
+        "--run",
+        action="store_true",
+        help="relance tous les tournois en attente, sans attendre le backoff",
+    )
+    retries.add_argument(
+        "--concurrency", type=int, default=10, help="tournois visités en parallèle"
+    )
+
+    export = commands.add_parser(
+        "export", help="export JSONL des tournois (compressé selon l'extension)"
+    )
+    export.add_argument(
+        "output", help="fichier de sortie (.jsonl, .jsonl.gz, .jsonl.zst ou -)"
+    )
+    export.add_argument(
+        "--since-stamp",
+        type=int,
+        default=None,
+        help="n'exporte que les tournois mis en base après cette estampille"
+        + " (last_stamp de l'export précédent)",
+    )
+    export.add_argument(
+        "--since-date",
+        type=date.fromisoformat,
+        default=None,
+        help="n'exporte que les tournois joués à partir de cette date (AAAA-MM-JJ)",
+    )
+    export.add_argument(
+        "--compression",
+        choices=["none", "gzip", "zstd"],
+        default=None,
+        help="compression (défaut : d'après l'extension du fichier)",
+    )
+    export.add_argument(
+        "--chunk-size", type=int, default=50, help="tournois lus par requête"
+    )
+
+    serve = commands.add_parser("serve", help="API JSON locale, en lecture seule")
+    serve.add_argument("--host", default="127.0.0.1", help="adresse d'écoute")
+    serve.add_argument("--port", type=int, default=8026, help="port d'écoute")
+
+    loadtest = commands.add_parser("loadtest", help="test de charge de l'API locale")
+    loadtest.add_argument(
+        "--url",
+        default=None,
+        help="API à tester, par exemple http://127.0.0.1:8026 (défaut : serveur"
+        + " lancé pour le test)",
+    )
+    loadtest.add_argument(
+        "--requests", type=int, default=2000, help="nombre total de requêtes"
+    )
+    loadtest.add_argument(
+        "--concurrency", type=int, default=8, help="connexions en parallèle"
+    )
+
+    return parser.parse_args(args)
+
+
+def emit(record: dict) -> None:
+    """Écriture d'un enregistrement JSON par ligne sur la sortie standard."""
+
+    print(json.dumps(record, default=str), flush=True)
+
+
+def dump_metrics(options: argparse.Namespace) -> None:
+    """Écriture des métriques du run dans le format demandé."""
+
+    from mtgdc_metrics import METRICS
+
+    if options.metrics_format == "prometheus":
+        output = METRICS.to_prometheus()
+    else:
+        output = METRICS.to_json() + "\n"
+
+    if options.metrics_file:
+        with open(options.metrics_file, "w", encoding="utf-8") as file:
+            file.write(output)
+    elif options.metrics_format == "prometheus":
+        sys.stderr.write(output)
+    else:
+        emit({"event": "metrics", "metrics": METRICS.to_dict()})
+
+
+def scrape(options: argparse.Namespace) -> int:
+    """Mise à jour des données puis scrap de mtgtop8, sans affichage."""
+
+    # Import tardif : le catalogue de cartes est chargé à l'import du scrapper
+    from mtgdc_carddata import init_cards, init_sets
+
+    if not options.no_refresh:
+        try:
+            init_sets()
+            init_cards()
+        except Exception as error:
+            emit({"event": "refresh", "status": "error", "error": repr(error)})
+            return 1
+
+    from mtgdc_metrics import METRICS
+    from mtgdc_scrapper import last_tournament_scrapped, scrap_mtgtop8
+
+    from_id = options.from_id
+    failures = 0
+    while True:
+        last_id = last_tournament_scrapped()
+        METRICS.reset()
+        stats = scrap_mtgtop8(
+            options.span,
+            concurrency=options.concurrency,
+            from_id=from_id,
+            processes=options.parse_processes,
+            retry="none" if options.no_retry else "due",
+        )
+        failures += stats["failures"]
+        emit({"event": "scrape", "from_id": from_id or last_id, **stats})
+        dump_metrics(options)
+
+        if not options.until_exhausted or last_id >= last_tournament_scrapped():
+            break
+        from_id = None  # Les runs suivants repartent du dernier tournoi en base
+
+    return 1 if failures else 0
+
+
+def bench(options: argparse.Namespace) -> int:
+    """Benchmark hors ligne, comparé éventuellement à une référence."""
+
+    from mtgdc_benchmark import compare, run_benchmarks
+
+    baseline = None
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    results = run_benchmarks(
+        options.scale,
+        options.repeats,
+        only=options.case,
+        fixtures=options.fixtures,
+        report=lambda name, result: emit({"event": "bench", "case": name, **result}),
+    )
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    errors = [name for name, result in results["cases"].items() if "error" in result]
+    if baseline is None:
+        return 1 if errors else 0
+
+    try:
+        regressions = compare(results, baseline, options.tolerance)
+    except ValueError as error:
+        emit({"event": "compare", "status": "error", "error": str(error)})
+        return 2
+    for regression in regressions:
+        emit({"event": "regression", **regression})
+    return 1 if errors or regressions else 0
+
+
+def memory(options: argparse.Namespace) -> int:
+    """Mesure des pics mémoire, en échec si un budget est dépassé."""
+
+    from mtgdc_memory import BUDGETS, STAGES, load_budgets, run_memory
+
+    budgets = load_budgets(options.budgets) if options.budgets else BUDGETS
+    results = run_memory(
+        options.scale or ["small", "medium"],
+        options.stage or STAGES,
+        budgets,
+        options.top,
+        report=lambda scale, stage, result: emit(
+            {"event": "memory", "scale": scale, "stage": stage, **result}
+        ),
+    )
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    failed = [
+        result
+        for stages in results.values()
+        for result in stages.values()
+        if "error" in result or result["over_budget"]
+    ]
+    return 1 if failed else 0
+
+
+def retries(options: argparse.Namespace) -> int:
+    """État de la file de relance, relancée d'abord avec `--run`."""
+
+    from mtgdc_database import (
+        Relances,
+        drop_stored_retries,
+        init_database,
+        unresolved_cards,
+    )
+
+    if options.run:
+        from mtgdc_scrapper import scrap_mtgtop8
+
+        stats = scrap_mtgtop8(0, concurrency=options.concurrency, retry="all")
+        emit({"event": "retry", **stats})
+
+    session = init_database()
+    drop_stored_retries(session)
+    for entry in session.query(Relances).order_by(Relances.tournoi_id):
+        emit(
+            {
+                "event": "queued",
+                "id": entry.tournoi_id,
+                "reason": entry.reason,
+                "attempts": entry.attempts,
+                "failed_at": entry.failed_at,
+                "retry_at": entry.retry_at,
+                "unknown_cards": entry.unknown_cards,
+                "error": entry.error,
+            }
+        )
+    emit({"event": "unresolved", "cards": unresolved_cards(session)})
+    session.close()
+    return 0
+
+
+def export(options: argparse.Namespace) -> int:
+    """Export JSONL des tournois en base."""
+
+    from mtgdc_export import export_tournaments
+
+    # La sortie standard peut porter l'export lui-même
+    report = sys.stderr if options.output == "-" else sys.stdout
+    try:
+        stats = export_tournaments(
+            options.output,
+            options.compression,
+            options.since_stamp,
+            options.since_date,
+            options.chunk_size,
+        )
+    except (OSError, ValueError) as error:
+        record = {"event": "export", "status": "error", "error": str(error)}
+        print(json.dumps(record), file=report)
+        return 1
+
+    record = {"event": "export", "output": options.output, **stats}
+    print(json.dumps(record), file=report)
+    return 0
+
+
+def serve(options: argparse.Namespace) -> int:
+    """Service de l'API locale jusqu'à interruption."""
+
+    from mtgdc_api import serve as serve_api
+
+    emit({"event": "serve", "url": f"http://{options.host}:{options.port}"})
+    serve_api(options.host, options.port)
+    return 0
+
+
+def loadtest(options: argparse.Namespace) -> int:
+    """Test de charge de l'API, sur les tournois et cartes de la base."""
+
+    import threading
+
+    from mtgdc_api import load_test, make_server, sample_paths
+
+    server = None
+    url = options.url
+    if url is None:
+        server = make_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://%s:%d" % server.server_address[:2]
+
+    try:
+        result = load_test(url, sample_paths(), options.requests, options.concurrency)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    if server is not None:
+        result["cache"] = server.api.stats()
+    emit({"event": "loadtest", "url": url, **result})
+    errors = sum(count for status, count in result["statuses"].items() if status >= 500)
+    return 1 if errors else 0
+
+
+def main(args: list = None) -> int:
+    """Exécution de la commande demandée, retourne le code de sortie."""
+
+    options = parse_args(sys.argv[1:] if args is None else args)
+    if options.command == "scrape":
+        return scrape(options)
+    if options.command == "bench":
+        return bench(options)
+    if options.command == "memory":
+        return memory(options)
+    if options.command == "retries":
+        return retries(options)
+    if options.command == "export":
+        return export(options)
+    if options.command == "serve":
+        return serve(options)
+    if options.command == "loadtest":
+        return loadtest(options)
+    return 2
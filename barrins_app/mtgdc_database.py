@@ -1,19 +1,26 @@
 """Module de gestion de base de données."""
 
+import hashlib
+import json
 from pathlib import Path
 
 import sqlalchemy
 from sqlalchemy import (
     JSON,
+    Boolean,
     Column,
     Date,
+    DateTime,
     ForeignKey,
     Integer,
+    LargeBinary,
     String,
     Table,
     create_engine,
     insert,
+    literal_column,
     select,
+    text,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
@@ -22,28 +29,60 @@ IntegrityError = sqlalchemy.exc.IntegrityError
 
 Base = declarative_base()
 
-decks_cartes = Table(
-    "decks_cartes",
+decklists_cartes = Table(
+    "decklists_cartes",
     Base.metadata,
-    Column("deck_id", ForeignKey("decks.id"), primary_key=True),
+    Column("decklist_id", ForeignKey("decklists.id"), primary_key=True),
     Column("carte_id", ForeignKey("cartes.id"), primary_key=True),
     Column("quantite", Integer, nullable=False, default=1),
 )
 
-decks_commanders = Table(
-    "decks_commanders",
+decklists_commanders = Table(
+    "decklists_commanders",
     Base.metadata,
-    Column("deck_id", ForeignKey("decks.id"), primary_key=True),
+    Column("decklist_id", ForeignKey("decklists.id"), primary_key=True),
     Column("carte_id", ForeignKey("cartes.id"), primary_key=True),
 )
 
+decks_signatures = Table(
+    "decks_signatures",
+    Base.metadata,
+    Column("deck_id", ForeignKey("decks.id"), primary_key=True),
+    Column("signature", LargeBinary, nullable=False),
+)
+
+lsh_buckets = Table(
+    "lsh_buckets",
+    Base.metadata,
+    Column("bucket", Integer, primary_key=True),
+    Column("deck_id", ForeignKey("decks.id"), primary_key=True),
+)
+
+
+cartes_alias = Table(
+    "cartes_alias",
+    Base.metadata,
+    # Nom scrappé (accents perdus, moitié de carte double...) déjà résolu
+    Column("alias", String, primary_key=True),
+    Column("carte_id", ForeignKey("cartes.id"), nullable=False),
+)
+
+
+# Estampille suivante de la table cartes, évaluée à chaque insertion ou mise à jour
+NEXT_STAMP = literal_column("(SELECT coalesce(max(stamp), 0) + 1 FROM cartes)")
+# Même principe pour l'ordre d'ingestion des tournois (exports incrémentaux)
+NEXT_TOURNOI_STAMP = literal_column(
+    "(SELECT coalesce(max(stamp), 0) + 1 FROM tournois)"
+)
+
 
 class Cartes(Base):
     """Tables cartes."""
 
     __tablename__ = "cartes"
 
-    id = Column(String, primary_key=True)
+    id = Column(Integer, primary_key=True)
+    oracle_id = Column(String, nullable=False, unique=True)
     name = Column(String, nullable=False)
     type = Column(String, nullable=False)
     mana_value = Column(Integer, nullable=False)
@@ -52,15 +91,110 @@ class Cartes(Base):
     first_print = Column(String, ForeignKey("sets.code"), nullable=False)
     legalities = Column(JSON, nullable=False)
 
-    decks = relationship("Decks", secondary=decks_cartes, back_populates="cartes")
+    # Indicateurs précalculés à l'ingestion (cf. `card_flags`)
+    can_lead = Column(Boolean, nullable=False, server_default="0", index=True)
+    dc_legal = Column(Boolean, nullable=False, server_default="0", index=True)
+    dc_restricted = Column(Boolean, nullable=False, server_default="0", index=True)
+    legal_formats = Column(Integer, nullable=False, server_default="0", index=True)
+
+    # Ordre des écritures, pour relire seulement les cartes ajoutées ou modifiées
+    stamp = Column(
+        Integer,
+        nullable=False,
+        server_default="0",
+        default=NEXT_STAMP,
+        onupdate=NEXT_STAMP,
+        index=True,
+    )
+
+    decklists = relationship(
+        "Decklists", secondary=decklists_cartes, back_populates="cartes"
+    )
     as_commander = relationship(
-        "Decks", secondary=decks_commanders, back_populates="commanders"
+        "Decklists", secondary=decklists_commanders, back_populates="commanders"
     )
 
     def __repr__(self):
         return f"<Carte `{self.name}`>"
 
 
+# Ordre figé : la position d'un format est son bit dans `Cartes.legal_formats`.
+# Les nouveaux formats s'ajoutent uniquement en fin de liste.
+FORMATS = [
+    "alchemy",
+    "brawl",
+    "commander",
+    "duel",
+    "explorer",
+    "future",
+    "gladiator",
+    "historic",
+    "historicbrawl",
+    "legacy",
+    "modern",
+    "oathbreaker",
+    "oldschool",
+    "pauper",
+    "paupercommander",
+    "penny",
+    "pioneer",
+    "predh",
+    "premodern",
+    "standard",
+    "standardbrawl",
+    "timeless",
+    "vintage",
+]
+
+
+def format_bit(format_name: str) -> int:
+    """Bit du format dans le masque de légalités."""
+    return 1 << FORMATS.index(format_name)
+
+
+def card_flags(name: str, card_type: str, card_text: str, legalities: dict) -> dict:
+    """Calcul des indicateurs d'éligibilité et de légalité d'une carte."""
+    card_type = card_type.lower()
+
+    if name.startswith("A-") or "legendary" not in card_type:
+        can_lead = False
+    elif "creature" not in card_type and "can be your commander" not in (
+        card_text.lower()
+    ):
+        can_lead = name.startswith("Grist, the Hunger Tide")
+    else:
+        can_lead = True
+
+    legal_formats = 0
+    for format_name, status in legalities.items():
+        if format_name in FORMATS and status in ("Legal", "Restricted"):
+            legal_formats |= format_bit(format_name)
+
+    return {
+        "can_lead": can_lead,
+        "dc_legal": legalities.get("duel") in ("Legal", "Restricted"),
+        "dc_restricted": legalities.get("duel") == "Restricted",
+        "legal_formats": legal_formats,
+    }
+
+
+class Decklists(Base):
+    """Tables decklists, partagées par tous les decks à la liste identique."""
+
+    __tablename__ = "decklists"
+
+    id = Column(Integer, primary_key=True)
+    hash = Column(String, nullable=False, unique=True)
+
+    decks = relationship("Decks", back_populates="decklist")
+    cartes = relationship(
+        "Cartes", secondary=decklists_cartes, back_populates="decklists"
+    )
+    commanders = relationship(
+        "Cartes", secondary=decklists_commanders, back_populates="as_commander"
+    )
+
+
 class Decks(Base):
     """Tables decks."""
 
@@ -68,13 +202,29 @@ class Decks(Base):
 
     id = Column(Integer, primary_key=True)
     tournoi_id = Column(Integer, ForeignKey("tournois.id"), nullable=False)
+    decklist_id = Column(
+        Integer, ForeignKey("decklists.id"), nullable=False, index=True
+    )
     rank = Column(String, nullable=False)
     player = Column(String, nullable=False)
 
     tournoi = relationship("Tournois", back_populates="decks")
-    cartes = relationship("Cartes", secondary=decks_cartes, back_populates="decks")
+    decklist = relationship("Decklists", back_populates="decks")
+
+    # Accès direct aux cartes de la decklist (lecture seule)
+    cartes = relationship(
+        "Cartes",
+        secondary=decklists_cartes,
+        primaryjoin=decklist_id == decklists_cartes.c.decklist_id,
+        secondaryjoin=Cartes.id == decklists_cartes.c.carte_id,
+        viewonly=True,
+    )
     commanders = relationship(
-        "Cartes", secondary=decks_commanders, back_populates="as_commander"
+        "Cartes",
+        secondary=decklists_commanders,
+        primaryjoin=decklist_id == decklists_commanders.c.decklist_id,
+        secondaryjoin=Cartes.id == decklists_commanders.c.carte_id,
+        viewonly=True,
     )
 
 
@@ -94,34 +244,541 @@ class Tournois(Base):
     __tablename__ = "tournois"
 
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    # Index utilisés par le tri et la pagination de l'affichage
+    name = Column(String, nullable=False, index=True)
     place = Column(String, nullable=False)
-    players = Column(Integer, nullable=False)
-    date = Column(Date, nullable=False)
+    players = Column(Integer, nullable=False, index=True)
+    date = Column(Date, nullable=False, index=True)
+    # Ordre d'ingestion : un tournoi rattrapé plus tard a une estampille récente
+    stamp = Column(
+        Integer,
+        nullable=False,
+        server_default="0",
+        default=NEXT_TOURNOI_STAMP,
+        index=True,
+    )
 
     decks = relationship("Decks", back_populates="tournoi")
 
 
+class Relances(Base):
+    """Tables relances : tournois en échec, à scrapper de nouveau."""
+
+    __tablename__ = "relances"
+
+    tournoi_id = Column(Integer, primary_key=True)
+    # unknown_card (carte inconnue du catalogue), missing_commander (export sans
+    # commandant), network ou error
+    reason = Column(String, nullable=False, index=True)
+    error = Column(String, nullable=False, default="")
+    unknown_cards = Column(JSON, nullable=False, default=list)
+    attempts = Column(Integer, nullable=False, default=1)
+    # Estampille du catalogue de cartes au moment de l'échec
+    catalog_stamp = Column(Integer, nullable=False, default=0)
+    failed_at = Column(DateTime, nullable=False)
+    retry_at = Column(DateTime, nullable=True)  # Fin du backoff (hors unknown_card)
+
+
+# Motifs tenant à la page elle-même et non au réseau : relancés au plus
+# RETRY_MAX_ATTEMPTS fois (mtgtop8 peut corriger l'export), puis abandonnés
+FINAL_REASONS = ("missing_commander",)
+RETRY_MAX_ATTEMPTS = 5
+
+
+CARTES_FTS = [
+    # Index plein texte synchronisé avec la table cartes par des triggers
+    """CREATE VIRTUAL TABLE IF NOT EXISTS cartes_fts USING fts5(
+        name, type, text,
+        content='cartes', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS cartes_fts_ai AFTER INSERT ON cartes BEGIN
+        INSERT INTO cartes_fts(rowid, name, type, text)
+        VALUES (new.rowid, new.name, new.type, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cartes_fts_ad AFTER DELETE ON cartes BEGIN
+        INSERT INTO cartes_fts(cartes_fts, rowid, name, type, text)
+        VALUES ('delete', old.rowid, old.name, old.type, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cartes_fts_au AFTER UPDATE ON cartes BEGIN
+        INSERT INTO cartes_fts(cartes_fts, rowid, name, type, text)
+        VALUES ('delete', old.rowid, old.name, old.type, old.text);
+        INSERT INTO cartes_fts(rowid, name, type, text)
+        VALUES (new.rowid, new.name, new.type, new.text);
+    END""",
+]
+
+
+# Tables des cartes par deck, antérieures aux decklists partagées
+LEGACY_DECKS_TABLES = [
+    """CREATE TABLE decks_cartes (
+        deck_id INTEGER NOT NULL REFERENCES decks (id),
+        carte_id INTEGER NOT NULL REFERENCES cartes (id),
+        quantite INTEGER NOT NULL,
+        PRIMARY KEY (deck_id, carte_id)
+    )""",
+    """CREATE TABLE decks_commanders (
+        deck_id INTEGER NOT NULL REFERENCES decks (id),
+        carte_id INTEGER NOT NULL REFERENCES cartes (id),
+        PRIMARY KEY (deck_id, carte_id)
+    )""",
+]
+
+
+# Base utilisée par l'application (remplacée par les benchmarks)
+DB_PATH = Path(__file__).parent / "barrins-data.sqlite"
+
+# Bases déjà mises à niveau par ce processus
+MIGRATED = set()
+
+
 def init_database():
     """Initialisation de la base de données."""
-    db_path = Path(__file__).parent / "barrins-data.sqlite"
+    db_path = DB_PATH
     engine = create_engine("sqlite:///" + str(db_path))
     Base.metadata.create_all(engine)
+    if db_path not in MIGRATED:
+        migrate_database(engine)
+        create_search_index(engine)
+        MIGRATED.add(db_path)
     Session = sessionmaker(bind=engine)
     return Session()
 
 
-def stmt_set_deck_carte(deck: Decks, carte: Cartes, quantite: int):
-    """Insertion de la quantité des cartes."""
-    return insert(decks_cartes).values(
-        deck_id=deck.id, carte_id=carte.id, quantite=int(quantite)
+def migrate_database(engine) -> None:
+    """Mise à niveau du schéma d'une base créée par une version antérieure."""
+    table = Cartes.__table__
+
+    with engine.begin() as connection:
+        existing = _table_columns(connection, "cartes")
+        needs_flags = "can_lead" not in existing
+        needs_keys = "oracle_id" not in existing
+
+        if needs_keys:
+            _migrate_card_keys(connection, existing)
+            existing = _table_columns(connection, "cartes")
+
+        missing = [column for column in table.columns if column.name not in existing]
+        for column in missing:
+            column_type = column.type.compile(engine.dialect)
+            connection.execute(
+                text(
+                    f"ALTER TABLE cartes ADD COLUMN {column.name} {column_type}"
+                    + f" NOT NULL DEFAULT {column.server_default.arg}"
+                )
+            )
+
+        if needs_flags:
+            _compute_card_flags(connection)
+
+        needs_decklists = "decklist_id" not in _table_columns(connection, "decks")
+        if needs_decklists:
+            _migrate_decklists(connection)
+
+        if "stamp" not in _table_columns(connection, "tournois"):
+            connection.execute(
+                text("ALTER TABLE tournois ADD COLUMN stamp INTEGER NOT NULL DEFAULT 0")
+            )
+            # Ordre d'ingestion inconnu : les tournois existants suivent leur id
+            connection.execute(text("UPDATE tournois SET stamp = id"))
+
+        # Index ajoutés au schéma depuis la création des tables
+        for schema_table in Base.metadata.sorted_tables:
+            for index in schema_table.indexes:
+                index.create(connection, checkfirst=True)
+
+    if needs_keys or needs_decklists:
+        # Récupération de l'espace libéré par la migration
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            connection.execute(text("VACUUM"))
+
+
+def _table_columns(connection, table_name: str) -> set:
+    """Noms des colonnes d'une table en base."""
+    return {
+        row[1] for row in connection.execute(text(f"PRAGMA table_info({table_name})"))
+    }
+
+
+def _migrate_card_keys(connection, existing: set) -> None:
+    """Passage de l'oracle id Scryfall à une clé entière pour les cartes.
+
+    L'oracle id est conservé dans la colonne unique `oracle_id`.
+    """
+    # Triggers et index de l'ancienne table sont recréés avec la nouvelle
+    for name, kind in connection.execute(
+        text(
+            "SELECT name, type FROM sqlite_master"
+            " WHERE tbl_name IN ('cartes', 'cartes_fts') AND name NOT LIKE 'sqlite_%'"
+        )
+    ).all():
+        if kind == "trigger":
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        elif kind == "index":
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    connection.execute(text("DROP TABLE IF EXISTS cartes_fts"))
+
+    # Sans le mode legacy, SQLite réécrirait les clés étrangères des autres tables
+    connection.execute(text("PRAGMA legacy_alter_table = ON"))
+    for table_name in ("cartes", "decks_cartes", "decks_commanders"):
+        connection.execute(text(f"ALTER TABLE {table_name} RENAME TO _{table_name}_v1"))
+    connection.execute(text("PRAGMA legacy_alter_table = OFF"))
+    Base.metadata.create_all(connection)
+    for statement in LEGACY_DECKS_TABLES:
+        connection.execute(text(statement))
+
+    columns = [
+        column.name
+        for column in Cartes.__table__.columns
+        if column.name in existing and column.name != "id"
+    ]
+    connection.execute(
+        text(
+            f"INSERT INTO cartes (id, oracle_id, {', '.join(columns)})"
+            + f" SELECT rowid, id, {', '.join(columns)} FROM _cartes_v1"
+        )
     )
+    connection.execute(
+        text(
+            "INSERT INTO decks_cartes (deck_id, carte_id, quantite)"
+            " SELECT dc.deck_id, c.rowid, dc.quantite FROM _decks_cartes_v1 dc"
+            " JOIN _cartes_v1 c ON c.id = dc.carte_id"
+        )
+    )
+    connection.execute(
+        text(
+            "INSERT INTO decks_commanders (deck_id, carte_id)"
+            " SELECT dc.deck_id, c.rowid FROM _decks_commanders_v1 dc"
+            " JOIN _cartes_v1 c ON c.id = dc.carte_id"
+        )
+    )
+
+    for table_name in ("decks_commanders", "decks_cartes", "cartes"):
+        connection.execute(text(f"DROP TABLE _{table_name}_v1"))
 
 
-def stmt_get_deck_carte(deck: Decks, carte: Cartes):
-    """Récupération de la quantité des cartes."""
-    return (
-        select(decks_cartes)
-        .where(decks_cartes.c.deck_id == deck.id)
-        .where(decks_cartes.c.carte_id == carte.id)
+def _migrate_decklists(connection) -> None:
+    """Regroupement des cartes de chaque deck en decklists partagées."""
+    connection.execute(
+        text(
+            "ALTER TABLE decks ADD COLUMN decklist_id INTEGER REFERENCES decklists(id)"
+        )
+    )
+
+    deck_ids = connection.execute(text("SELECT id FROM decks ORDER BY id")).scalars()
+    deck_ids = deck_ids.all()
+    for start in range(0, len(deck_ids), 1000):
+        chunk = deck_ids[start : start + 1000]
+        placeholders = ", ".join(str(deck_id) for deck_id in chunk)
+
+        decks = {deck_id: ([], []) for deck_id in chunk}
+        for row in connection.execute(
+            text(
+                "SELECT dc.deck_id, c.id, c.name FROM decks_commanders dc"
+                " JOIN cartes c ON c.id = dc.carte_id"
+                f" WHERE dc.deck_id IN ({placeholders})"
+            )
+        ):
+            decks[row.deck_id][0].append(row)
+        for row in connection.execute(
+            text(
+                "SELECT dc.deck_id, c.id, c.name, dc.quantite FROM decks_cartes dc"
+                " JOIN cartes c ON c.id = dc.carte_id"
+                f" WHERE dc.deck_id IN ({placeholders})"
+            )
+        ):
+            decks[row.deck_id][1].append((row, row.quantite))
+
+        connection.execute(
+            Decks.__table__.update().where(
+                Decks.__table__.c.id == sqlalchemy.bindparam("deck_id")
+            ),
+            [
+                {
+                    "deck_id": deck_id,
+                    "decklist_id": store_decklist(connection, *decklist),
+                }
+                for deck_id, decklist in decks.items()
+            ],
+        )
+
+    connection.execute(text("DROP TABLE decks_commanders"))
+    connection.execute(text("DROP TABLE decks_cartes"))
+
+
+def _compute_card_flags(connection) -> None:
+    """Calcul des indicateurs pour les cartes déjà en base."""
+    table = Cartes.__table__
+    cards = connection.execute(
+        select(Cartes.id, Cartes.name, Cartes.type, Cartes.text, Cartes.legalities)
+    ).all()
+    if cards:
+        connection.execute(
+            table.update().where(table.c.id == sqlalchemy.bindparam("card_id")),
+            [{"card_id": card.id, **card_flags(*card[1:])} for card in cards],
+        )
+
+
+def create_search_index(engine) -> None:
+    """Création de l'index plein texte des cartes s'il n'existe pas encore."""
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'cartes_fts'")
+        ).first()
+        if exists:
+            return
+
+        for statement in CARTES_FTS:
+            connection.execute(text(statement))
+        rebuild_search_index(connection)
+
+
+def rebuild_search_index(connection) -> None:
+    """Reconstruction complète de l'index plein texte depuis la table cartes."""
+    connection.execute(text("INSERT INTO cartes_fts(cartes_fts) VALUES ('rebuild')"))
+
+
+def _merge_quantites(cartes: list) -> list:
+    """Regroupement des lignes d'une même carte."""
+    quantites = {}
+    for carte, quantite in cartes:
+        quantites.setdefault(carte.id, [carte, 0])[1] += int(quantite)
+    return [tuple(item) for item in quantites.values()]
+
+
+def decklist_hash(commanders: list, cartes: list) -> str:
+    """Empreinte canonique d'une decklist (commandants, couples carte/quantité)."""
+    cartes = _merge_quantites(cartes)
+    content = {
+        "commanders": sorted({carte.name for carte in commanders}),
+        "cartes": sorted([carte.name, int(quantite)] for carte, quantite in cartes),
+    }
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+
+def store_decklist(session, commanders: list, cartes: list) -> int:
+    """Retourne l'id de la decklist, insérée seulement si elle est nouvelle.
+
+    `commanders` est une liste de cartes, `cartes` une liste de couples
+    (carte, quantité) ; seuls les attributs `id` et `name` sont utilisés.
+    """
+    cartes = _merge_quantites(cartes)
+    commanders = list({carte.id: carte for carte in commanders}.values())
+
+    digest = decklist_hash(commanders, cartes)
+    result = session.execute(
+        insert(Decklists).prefix_with("OR IGNORE").values(hash=digest)
+    )
+    decklist_id = session.execute(
+        select(Decklists.id).where(Decklists.hash == digest)
+    ).scalar()
+
+    if result.rowcount == 1 and commanders:
+        session.execute(
+            insert(decklists_commanders),
+            [
+                {"decklist_id": decklist_id, "carte_id": carte.id}
+                for carte in commanders
+            ],
+        )
+    if result.rowcount == 1 and cartes:
+        session.execute(
+            insert(decklists_cartes),
+            [
+                {"decklist_id": decklist_id, "carte_id": carte.id, "quantite": qty}
+                for carte, qty in cartes
+            ],
+        )
+
+    return decklist_id
+
+
+def decklist_plays(session, commanders: list, cartes: list) -> int:
+    """Nombre de decks enregistrés avec exactement cette liste."""
+    digest = decklist_hash(commanders, cartes)
+    return session.execute(
+        select(sqlalchemy.func.count(Decks.id))
+        .join(Decklists, Decklists.id == Decks.decklist_id)
+        .where(Decklists.hash == digest)
+    ).scalar()
+
+
+def tournament_dicts(session, tournois) -> list:
+    """Tournois au format de `MTGTournoi.to_dict`, decks et decklists compris.
+
+    `tournois` est une requête (select) des tournois voulus ; les decklists
+    sont lues en trois requêtes, quel que soit le nombre de tournois. Les ids
+    sont des chaînes, comme ceux lus sur mtgtop8 par `MTGTournoi`.
+    """
+    tournois = session.execute(tournois.order_by(Tournois.id)).scalars().all()
+    tournoi_ids = [tournoi.id for tournoi in tournois]
+
+    decks = session.execute(
+        select(Decks.id, Decks.tournoi_id, Decks.rank, Decks.player, Decks.decklist_id)
+        .where(Decks.tournoi_id.in_(tournoi_ids))
+        .order_by(Decks.id)
+    ).all()
+    decklist_ids = select(Decks.decklist_id).where(Decks.tournoi_id.in_(tournoi_ids))
+
+    commanders = {}
+    for decklist_id, name in session.execute(
+        select(decklists_commanders.c.decklist_id, Cartes.name)
+        .join(Cartes, Cartes.id == decklists_commanders.c.carte_id)
+        .where(decklists_commanders.c.decklist_id.in_(decklist_ids))
+        .order_by(Cartes.name)
+    ):
+        commanders.setdefault(decklist_id, []).append(name)
+
+    cartes = {}
+    for decklist_id, quantite, name in session.execute(
+        select(decklists_cartes.c.decklist_id, decklists_cartes.c.quantite, Cartes.name)
+        .join(Cartes, Cartes.id == decklists_cartes.c.carte_id)
+        .where(decklists_cartes.c.decklist_id.in_(decklist_ids))
+        .order_by(Cartes.name)
+    ):
+        cartes.setdefault(decklist_id, []).append(f"{quantite} {name}")
+
+    response = {
+        tournoi.id: {
+            "format": "Duel Commander",
+            "id": str(tournoi.id),
+            "name": tournoi.name,
+            "place": tournoi.place,
+            "players": tournoi.players,
+            "date": str(tournoi.date),
+            "decks": [],
+        }
+        for tournoi in tournois
+    }
+    for deck in decks:
+        response[deck.tournoi_id]["decks"].append(
+            {
+                "id": str(deck.id),
+                "rank": deck.rank,
+                "player": deck.player,
+                "commander": commanders.get(deck.decklist_id, []),
+                "decklist": cartes.get(deck.decklist_id, []),
+            }
+        )
+    return list(response.values())
+
+
+def card_usage(session, name: str = None, limit: int = 50) -> list:
+    """Nombre de decks (commandant compris) et de tournois où une carte est jouée.
+
+    Sans `name`, retourne les `limit` cartes les plus jouées.
+    """
+    func = sqlalchemy.func
+    plays = sqlalchemy.union(
+        select(decklists_cartes.c.decklist_id, decklists_cartes.c.carte_id),
+        select(decklists_commanders.c.decklist_id, decklists_commanders.c.carte_id),
+    ).subquery()
+
+    stmt = (
+        select(
+            Cartes.id,
+            Cartes.name,
+            func.count(Decks.id),
+            func.count(sqlalchemy.distinct(Decks.tournoi_id)),
+            func.min(Tournois.date),
+            func.max(Tournois.date),
+        )
+        .select_from(Cartes)
+        .join(plays, plays.c.carte_id == Cartes.id)
+        .join(Decks, Decks.decklist_id == plays.c.decklist_id)
+        .join(Tournois, Tournois.id == Decks.tournoi_id)
+        .group_by(Cartes.id)
+    )
+    if name is not None:
+        stmt = stmt.where(Cartes.name == name)
+    else:
+        stmt = stmt.order_by(func.count(Decks.id).desc(), Cartes.name).limit(limit)
+
+    usage = {
+        row[0]: {
+            "card": row[1],
+            "decks": row[2],
+            "as_commander": 0,
+            "tournaments": row[3],
+            "first_seen": str(row[4]),
+            "last_seen": str(row[5]),
+        }
+        for row in session.execute(stmt)
+    }
+
+    stmt = (
+        select(decklists_commanders.c.carte_id, func.count(Decks.id))
+        .join(Decks, Decks.decklist_id == decklists_commanders.c.decklist_id)
+        .where(decklists_commanders.c.carte_id.in_(list(usage)))
+        .group_by(decklists_commanders.c.carte_id)
+    )
+    for carte_id, decks in session.execute(stmt):
+        usage[carte_id]["as_commander"] = decks
+
+    return list(usage.values())
+
+
+def catalog_stamp(session) -> int:
+    """Estampille la plus récente du catalogue de cartes."""
+
+    return session.execute(
+        select(sqlalchemy.func.coalesce(sqlalchemy.func.max(Cartes.stamp), 0))
+    ).scalar()
+
+
+def drop_stored_retries(session) -> int:
+    """Retrait (avec commit) des relances de tournois déjà en base."""
+    result = session.execute(
+        sqlalchemy.delete(Relances).where(Relances.tournoi_id.in_(select(Tournois.id)))
+    )
+    session.commit()
+    return result.rowcount
+
+
+def due_retries(session, now, force: bool = False) -> list:
+    """Tournois en échec à scrapper de nouveau, par id croissant.
+
+    Un échec pour carte inconnue est relancé quand le catalogue a changé depuis,
+    les autres à la fin de leur backoff ; `force` les relance tous. Les relances
+    de tournois entre-temps mis en base sont supprimées, celles abandonnées
+    (`FINAL_REASONS` après `RETRY_MAX_ATTEMPTS` tentatives) ne sont plus dues.
+    """
+    drop_stored_retries(session)
+    stmt = select(Relances.tournoi_id).where(
+        sqlalchemy.not_(
+            sqlalchemy.and_(
+                Relances.reason.in_(FINAL_REASONS),
+                Relances.attempts >= RETRY_MAX_ATTEMPTS,
+            )
+        )
     )
+    if not force:
+        stmt = stmt.where(
+            sqlalchemy.or_(
+                sqlalchemy.and_(
+                    Relances.reason == "unknown_card",
+                    Relances.catalog_stamp < catalog_stamp(session),
+                ),
+                sqlalchemy.and_(
+                    Relances.reason != "unknown_card", Relances.retry_at <= now
+                ),
+            )
+        )
+    return session.execute(stmt.order_by(Relances.tournoi_id)).scalars().all()
+
+
+def unresolved_cards(session) -> list:
+    """Noms non résolus des tournois en attente, par nombre de tournois touchés."""
+    tournaments = {}
+    for names in session.execute(
+        select(Relances.unknown_cards).where(Relances.reason == "unknown_card")
+    ).scalars():
+        for name in set(names):
+            tournaments[name] = tournaments.get(name, 0) + 1
+
+    return [
+        {"name": name, "tournaments": count}
+        for name, count in sorted(tournaments.items(), key=lambda i: (-i[1], i[0]))
+    ]
@@ -0,0 +1,145 @@
+"""Module d'export des tournois en base, une ligne JSON par tournoi.
+
+Chaque ligne a le format de `MTGTournoi.to_dict` (decks au format de
+`MTGDeck.to_dict`). Les tournois sont lus par lots, dans l'ordre de leur mise
+en base (colonne `stamp`) : la mémoire utilisée dépend de la taille d'un lot,
+pas de celle de la base.
+
+L'export incrémental reprend après l'estampille du dernier tournoi exporté, et
+non après son id : les tournois rattrapés plus tard (file de relance, scrap
+avec `--from-id`) ont un id inférieur aux derniers exportés mais une
+estampille plus récente, ils sont donc bien écrits.
+"""
+
+import gzip
+import io
+import json
+import sys
+from contextlib import contextmanager
+from datetime import date
+
+from mtgdc_database import Tournois, init_database, tournament_dicts
+from sqlalchemy import select, tuple_
+
+try:
+    import zstandard
+except ImportError:  # Dépendance optionnelle
+    zstandard = None
+
+CHUNK_SIZE = 50  # Tournois lus par requête (la mémoire de l'export en dépend)
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+
+def compression_for(path: str) -> str:
+    """Compression déduite de l'extension du fichier de sortie."""
+
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return "none"
+
+
+@contextmanager
+def open_output(path: str, compression: str):
+    """Flux texte de sortie, compressé si demandé ("-" : sortie standard)."""
+
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compression inconnue : {compression}")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("La compression zstd demande le paquet zstandard")
+
+    if path == "-":
+        raw = open(sys.stdout.fileno(), "wb", closefd=False)
+    else:
+        raw = open(path, "wb")
+
+    with raw:
+        if compression == "gzip":
+            stream = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0)
+        elif compression == "zstd":
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+        else:
+            stream = raw
+
+        # Le flux texte ferme le flux compressé, qui écrit alors sa fin
+        output = io.TextIOWrapper(stream, "utf-8", newline="\n")
+        if stream is raw:
+            yield output
+            output.flush()
+            output.detach()
+        else:
+            with output:
+                yield output
+
+
+def iter_tournaments(
+    since_stamp: int = None, since_date: date = None, chunk_size: int = CHUNK_SIZE
+):
+    """(estampille, tournoi) au format de `MTGTournoi.to_dict`, par ordre d'ingestion.
+
+    `since_stamp` ne garde que les tournois mis en base après cette estampille ;
+    `since_date` est un filtre sur la date des tournois (ceux qui ont eu lieu ce
+    jour-là ou après), pas un point de reprise.
+    """
+
+    session = init_database()
+    last_key = None
+    try:
+        while True:
+            stmt = select(Tournois.id, Tournois.stamp)
+            if since_stamp is not None:
+                stmt = stmt.where(Tournois.stamp > since_stamp)
+            if last_key is not None:
+                stmt = stmt.where(
+                    tuple_(Tournois.stamp, Tournois.id) > tuple_(*last_key)
+                )
+            if since_date is not None:
+                stmt = stmt.where(Tournois.date >= since_date)
+            keys = session.execute(
+                stmt.order_by(Tournois.stamp, Tournois.id).limit(chunk_size)
+            ).all()
+            if len(keys) == 0:
+                break
+
+            chunk = tournament_dicts(
+                session, select(Tournois).where(Tournois.id.in_([k.id for k in keys]))
+            )
+            session.expunge_all()  # Rien ne reste en mémoire d'un lot à l'autre
+
+            by_id = {tournoi["id"]: tournoi for tournoi in chunk}
+            for key in keys:
+                yield key.stamp, by_id[str(key.id)]
+            last_key = (keys[-1].stamp, keys[-1].id)
+    finally:
+        session.close()
+
+
+def export_tournaments(
+    path: str,
+    compression: str = None,
+    since_stamp: int = None,
+    since_date: date = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> dict:
+    """Export des tournois dans `path` ; retourne les compteurs de l'export.
+
+    `last_stamp` est l'estampille du dernier tournoi écrit, à passer en
+    `since_stamp` à l'export incrémental suivant.
+    """
+
+    compression = compression or compression_for(path)
+    stats = {"tournaments": 0, "decks": 0, "last_stamp": since_stamp}
+
+    with open_output(path, compression) as output:
+        for stamp, tournoi in iter_tournaments(since_stamp, since_date, chunk_size):
+            output.write(json.dumps(tournoi, ensure_ascii=False) + "\n")
+            stats["tournaments"] += 1
+            stats["decks"] += len(tournoi["decks"])
+            stats["last_stamp"] = stamp
+
+    return stats
+
+
+if __name__ == "__main__":
+    print(export_tournaments("-"), file=sys.stderr)
@@ -0,0 +1,232 @@
+"""Module de mesure de la mémoire du rafraîchissement des cartes.
+
+Chaque étape (chargement du JSON AtomicCards, ingestion en base, construction
+du catalogue `DBCards`) est exécutée sur les fixtures des benchmarks dans un
+processus neuf, pour que son pic ne dépende pas des étapes précédentes.
+Le pic suivi par tracemalloc ne compte que les allocations Python ; le pic de
+RSS compte tout le processus, y compris le suivi de tracemalloc lui-même.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from pathlib import Path
+
+import mtgdc_database
+from mtgdc_benchmark import build_fixtures, load_mtgjson
+from mtgdc_carddata import AllCards, AllSets, DBCards
+
+STAGES = ("json_load", "ingest", "catalog")
+SAMPLE_SECONDS = 0.01
+MB = 1 << 20
+
+# Budgets en Mo par échelle et par étape (pic tracemalloc, pic de RSS), fixés
+# à environ une fois et demie les mesures sur les fixtures des benchmarks
+BUDGETS = {
+    "small": {
+        "json_load": {"traced_mb": 6, "rss_mb": 90},
+        "ingest": {"traced_mb": 4, "rss_mb": 90},
+        "catalog": {"traced_mb": 7, "rss_mb": 100},
+    },
+    "medium": {
+        "json_load": {"traced_mb": 23, "rss_mb": 125},
+        "ingest": {"traced_mb": 4, "rss_mb": 110},
+        "catalog": {"traced_mb": 24, "rss_mb": 140},
+    },
+    "large": {
+        "json_load": {"traced_mb": 115, "rss_mb": 300},
+        "ingest": {"traced_mb": 8, "rss_mb": 170},
+        "catalog": {"traced_mb": 115, "rss_mb": 340},
+    },
+}
+
+
+def current_rss() -> int:
+    """RSS courant du processus en octets (None hors Linux)."""
+
+    try:
+        with open("/proc/self/statm", encoding="ascii") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RSSSampler:
+    """Relevé périodique du RSS dans un thread, pour en garder le pic."""
+
+    def __init__(self) -> None:
+        self.peak = current_rss()
+        self.running = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while self.running.is_set():
+            rss = current_rss()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+            time.sleep(SAMPLE_SECONDS)
+
+    def __enter__(self):
+        if self.peak is not None:
+            self.running.set()
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.running.is_set():
+            self.running.clear()
+            self.thread.join()
+            self.peak = max(self.peak, current_rss())
+
+
+def top_sites(snapshot, limit: int) -> list:
+    """Lignes de code qui détiennent le plus de mémoire dans l'instantané."""
+
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+    )
+    return [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_mb": stat.size / MB,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def measure_stage(stage: str, fixtures: str, db_path: str, top: int = 10) -> dict:
+    """Mesure d'une étape ; appelée dans un processus dédié."""
+
+    fixtures = Path(fixtures)
+    mtgdc_database.DB_PATH = Path(db_path)
+
+    if stage == "json_load":
+        run = partial(load_mtgjson, AllCards, fixtures / "AtomicCards.json.gz")
+    elif stage == "ingest":
+        load_mtgjson(AllSets, fixtures / "SetList.json.gz")._upgrade()
+        loader = load_mtgjson(AllCards, fixtures / "AtomicCards.json.gz")
+        run = loader._upgrade
+    elif stage == "catalog":
+        mtgdc_database.init_database().close()  # Migrations hors mesure
+        run = DBCards
+    else:
+        raise ValueError(f"Étape inconnue : {stage}")
+
+    rss_before = current_rss()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with RSSSampler() as sampler:
+        result = run()
+    elapsed = time.perf_counter() - start
+
+    # Instantané pris tant que le résultat de l'étape est encore référencé
+    _, traced_peak = tracemalloc.get_traced_memory()
+    sites = top_sites(tracemalloc.take_snapshot(), top)
+    tracemalloc.stop()
+    del result
+
+    return {
+        "seconds": elapsed,
+        "traced_mb": traced_peak / MB,
+        "rss_mb": sampler.peak / MB if sampler.peak is not None else None,
+        "rss_before_mb": rss_before / MB if rss_before is not None else None,
+        "top": sites,
+    }
+
+
+def check_budget(result: dict, budget: dict) -> list:
+    """Mesures qui dépassent le budget de l'étape."""
+
+    return [
+        {"measure": measure, "value": result[measure], "budget": limit}
+        for measure, limit in budget.items()
+        if result.get(measure) is not None and result[measure] > limit
+    ]
+
+
+def run_memory(
+    scales: list = ("small",),
+    stages: list = STAGES,
+    budgets: dict = None,
+    top: int = 10,
+    report=None,
+) -> dict:
+    """Mesure des étapes demandées à chaque échelle et contrôle des budgets.
+
+    `report` reçoit (échelle, étape, résultat) après chaque mesure ; les
+    dépassements sont dans `result["over_budget"]`.
+    """
+
+    budgets = BUDGETS if budgets is None else budgets
+    work = Path(tempfile.mkdtemp(prefix="barrins-memory-"))
+    results = {}
+
+    try:
+        for scale in scales:
+            fixtures = work / scale
+            build_fixtures(fixtures, scale)
+            db_path = work / f"{scale}.sqlite"
+            if "ingest" not in stages and "catalog" in stages:
+                # Le catalogue se construit depuis la base remplie par l'ingestion
+                with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                    pool.submit(
+                        measure_stage, "ingest", str(fixtures), str(db_path), 0
+                    ).result()
+
+            results[scale] = {}
+            for stage in STAGES:
+                if stage not in stages:
+                    continue
+                try:
+                    with ProcessPoolExecutor(
+                        1, mp_context=get_context("spawn")
+                    ) as pool:
+                        result = pool.submit(
+                            measure_stage, stage, str(fixtures), str(db_path), top
+                        ).result()
+                except Exception as error:
+                    result = {"error": repr(error)}
+                else:
+                    budget = budgets.get(scale, {}).get(stage, {})
+                    result["over_budget"] = check_budget(result, budget)
+
+                results[scale][stage] = result
+                if report:
+                    report(scale, stage, result)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    return results
+
+
+def load_budgets(path: str) -> dict:
+    """Budgets lus depuis un fichier JSON, par-dessus les budgets par défaut."""
+
+    with open(path, encoding="utf-8") as file:
+        overrides = json.load(file)
+
+    budgets = {scale: dict(stages) for scale, stages in BUDGETS.items()}
+    for scale, stages in overrides.items():
+        for stage, budget in stages.items():
+            budgets.setdefault(scale, {})[stage] = {
+                **budgets.get(scale, {}).get(stage, {}),
+                **budget,
+            }
+    return budgets
+
+
+if __name__ == "__main__":
+    for scale_name, scale_results in run_memory().items():
+        for stage_name, stage_result in scale_results.items():
+            print(scale_name, stage_name, json.dumps(stage_result, indent=2))
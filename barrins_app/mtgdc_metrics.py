@@ -0,0 +1,197 @@
+"""Module d'instrumentation du scrapping : durées par étape et compteurs."""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Bornes supérieures (en secondes) des histogrammes de durée
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """Compteur cumulatif."""
+
+    kind = "counter"
+
+    def __init__(self, registry, name: str, description: str) -> None:
+        self.registry = registry
+        self.name = name
+        self.description = description
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        """Incrémentation du compteur."""
+
+        with self.registry.lock:
+            self.value += amount
+        self.registry.notify(self.name, amount)
+
+    def reset(self) -> None:
+        """Remise à zéro du compteur."""
+
+        self.value = 0
+
+    def snapshot(self) -> dict:
+        """Valeur courante sous forme de dict."""
+
+        return {"type": self.kind, "value": self.value}
+
+    def prometheus(self) -> list:
+        """Lignes d'exposition Prometheus."""
+
+        return [f"{self.name} {self.value}"]
+
+
+class Histogram:
+    """Histogramme de durées, au format des histogrammes Prometheus."""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name: str, description: str) -> None:
+        self.registry = registry
+        self.name = name
+        self.description = description
+        self.reset()
+
+    def observe(self, value: float) -> None:
+        """Ajout d'une observation."""
+
+        with self.registry.lock:
+            self.count += 1
+            self.sum += value
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    self.buckets[index] += 1
+                    break
+        self.registry.notify(self.name, value)
+
+    @contextmanager
+    def time(self):
+        """Mesure de la durée du bloc `with`."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def reset(self) -> None:
+        """Remise à zéro de l'histogramme."""
+
+        self.count = 0
+        self.sum = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def snapshot(self) -> dict:
+        """Valeurs courantes sous forme de dict."""
+
+        return {
+            "type": self.kind,
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "buckets": {str(bound): n for bound, n in zip(BUCKETS, self.buckets)},
+        }
+
+    def prometheus(self) -> list:
+        """Lignes d'exposition Prometheus (compteurs de buckets cumulés)."""
+
+        lines = []
+        cumulative = 0
+        for bound, n in zip(BUCKETS, self.buckets):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Registry:
+    """Ensemble des métriques, avec abonnement aux observations."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.callbacks = []
+
+    def counter(self, name: str, description: str) -> Counter:
+        """Déclaration (ou récupération) d'un compteur."""
+
+        return self.metrics.setdefault(name, Counter(self, name, description))
+
+    def histogram(self, name: str, description: str) -> Histogram:
+        """Déclaration (ou récupération) d'un histogramme."""
+
+        return self.metrics.setdefault(name, Histogram(self, name, description))
+
+    def subscribe(self, callback) -> None:
+        """Le callback reçoit (nom de la métrique, valeur) à chaque observation."""
+
+        self.callbacks.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        """Fin d'abonnement d'un callback."""
+
+        self.callbacks.remove(callback)
+
+    def notify(self, name: str, value) -> None:
+        """Transmission d'une observation aux abonnés."""
+
+        for callback in list(self.callbacks):
+            callback(name, value)
+
+    def reset(self) -> None:
+        """Remise à zéro, par exemple au début d'un run."""
+
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.reset()
+
+    def to_dict(self) -> dict:
+        """Export de toutes les métriques sous forme de dict."""
+
+        with self.lock:
+            return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def to_json(self) -> str:
+        """Export de toutes les métriques en JSON."""
+
+        return json.dumps(self.to_dict())
+
+    def to_prometheus(self) -> str:
+        """Export au format texte d'exposition Prometheus."""
+
+        lines = []
+        with self.lock:
+            for metric in self.metrics.values():
+                lines.append(f"# HELP {metric.name} {metric.description}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.prometheus())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+FETCH_SECONDS = METRICS.histogram(
+    "scrap_fetch_seconds", "Attente des réponses HTTP de mtgtop8."
+)
+PARSE_SECONDS = METRICS.histogram(
+    "scrap_parse_seconds", "Parsing BeautifulSoup des pages."
+)
+CARD_RESOLUTION_SECONDS = METRICS.histogram(
+    "scrap_card_resolution_seconds", "Résolution d'un nom de carte par DBCards.get."
+)
+DB_WRITE_SECONDS = METRICS.histogram(
+    "scrap_db_write_seconds", "Écriture d'un tournoi en base (decks, index et commit)."
+)
+
+REQUESTS = METRICS.counter("scrap_requests_total", "Requêtes HTTP envoyées.")
+RETRIES = METRICS.counter("scrap_retries_total", "Nouvelles tentatives de scrap.")
+UNKNOWN_CARDS = METRICS.counter(
+    "scrap_unknown_cards_total", "Noms de cartes non résolus."
+)
+ROWS_WRITTEN = METRICS.counter(
+    "scrap_rows_written_total", "Lignes tournois et decks écrites en base."
+)
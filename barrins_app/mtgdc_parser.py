@@ -0,0 +1,147 @@
+"""Module de parsing des pages de mtgtop8 en enregistrements simples.
+
+Les fonctions `parse_event` et `parse_decklist` prennent les octets d'une page
+et retournent des dicts de types de base : elles peuvent être exécutées dans un
+pool de processus, sans dépendre du catalogue de cartes ni de la base.
+"""
+
+import re
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+ENCODING = "iso-8859-1"  # Encodage du site mtgtop8
+NO_COMMANDER = "Unknown Card"  # Commandant d'un export sans sideboard
+
+
+def make_soup(content: bytes) -> BeautifulSoup:
+    """Parsing HTML d'une page de mtgtop8."""
+
+    return BeautifulSoup(content, "html.parser", from_encoding=ENCODING)
+
+
+def event_is_commander(soup: BeautifulSoup) -> bool:
+    """La page contient-elle un tournoi en Duel Commander ?"""
+
+    tag = soup.find("div", class_="meta_arch")
+    return tag is not None and "Duel Commander" in tag.text
+
+
+def event_name_place(soup: BeautifulSoup) -> tuple:
+    """Nom et lieu de l'événement (chaînes vides s'ils sont absents)."""
+
+    name, place = "", ""
+    tag = soup.find("div", class_="event_title")
+    if tag is not None:
+        if "@" not in tag.text:
+            name = tag.text
+        else:
+            name, place = re.split("@", tag.text, maxsplit=1)
+            name, place = name.strip(), place.strip()
+    return name, place
+
+
+def event_players_date(soup: BeautifulSoup) -> tuple:
+    """Nombre de joueurs et date de l'événement (0 et None s'ils sont absents)."""
+
+    players, event_date = 0, None
+    div_meta_arch = soup.find("div", class_="meta_arch")
+    if div_meta_arch:
+        tags = div_meta_arch.parent.find_all("div")
+        for tag in tags:
+            line = "".join(tag.text)
+            if re.match(r"[0-9][0-9]/[0-9][0-9]", line) and "-" not in line:
+                event_date = datetime.strptime(line, "%d/%m/%y")
+            elif "players" in line and "-" not in line:
+                players = int(line.strip().split(" ", maxsplit=1)[0].strip())
+            elif "players" in line and "-" in line:
+                players, date = re.split("-", line)
+                players = int(players.strip().split(" ", maxsplit=1)[0].strip())
+                event_date = datetime.strptime(date.strip(), "%d/%m/%y").date()
+    return players, event_date
+
+
+def event_deck_refs(soup: BeautifulSoup) -> list:
+    """Decks de la page : (id du deck, rang, joueur), top 8 en premier."""
+
+    refs = []
+    deck_ids = set()  # Cas de nesting de balise dans certains tournois
+
+    for tag in soup.select("div.S14 a[href^='?e=']"):
+        block = tag.parent.parent.parent
+        try:
+            player = block.find("a", attrs={"class": "player"}).string.strip()
+        except AttributeError:
+            continue
+
+        rank = 0
+        for div in block.find_all("div"):
+            if div.string is not None:
+                if re.match(r"\d(?:-\d)?", div.string):
+                    rank = div.string
+
+        deck_id = re.split("=", tag["href"])[2][:-2]
+        refs.append((deck_id, rank, player))
+        deck_ids.add(deck_id)
+
+    for option in soup.select("optgroup option"):
+        if option["value"] in deck_ids:
+            continue
+        player = re.split(" - ", option.contents[0], maxsplit=1)[1].strip()
+        rank = re.split("#", option.parent["label"], maxsplit=1)[1]
+        refs.append((option["value"], rank, player))
+        deck_ids.add(option["value"])
+
+    return refs
+
+
+def parse_event(content: bytes) -> dict:
+    """Enregistrement d'une page d'événement.
+
+    Les decks ne sont relevés que pour les tournois de Duel Commander.
+    """
+
+    soup = make_soup(content)
+    name, place = event_name_place(soup)
+    players, event_date = event_players_date(soup)
+    is_commander = event_is_commander(soup)
+
+    return {
+        "is_commander": is_commander,
+        "name": name,
+        "place": place,
+        "players": players,
+        "date": event_date,
+        "decks": event_deck_refs(soup) if is_commander else [],
+    }
+
+
+def decklist_sections(decklist: str) -> tuple:
+    """Lignes du mainboard ("1 Sol Ring") et noms des commandants d'un export."""
+
+    if "Sideboard" not in decklist:
+        mainboard = [line.strip() for line in decklist.split("\n") if line.strip()]
+        return mainboard, [NO_COMMANDER]
+
+    main, side = re.split("Sideboard", decklist)[:2]
+    mainboard = [line.strip() for line in main.split("\n") if line.strip()]
+    commander = [
+        line[2:].strip() for line in side.split("\n") if len(line[2:].strip()) > 0
+    ]
+    return mainboard, commander
+
+
+def parse_decklist(content: bytes) -> dict:
+    """Enregistrement d'un export MTGO, avant résolution des noms de cartes.
+
+    `missing_commander` signale un export sans sideboard : le commandant est
+    alors `NO_COMMANDER`, qu'aucune mise à jour du catalogue ne résoudra.
+    """
+
+    decklist = make_soup(content).prettify()
+    mainboard, commander = decklist_sections(decklist)
+    return {
+        "mainboard": mainboard,
+        "commander": commander,
+        "missing_commander": "Sideboard" not in decklist,
+    }
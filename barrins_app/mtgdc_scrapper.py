@@ -1,17 +1,46 @@
 """Module de scrap de MTGTOP8 et de mise en base des tournois."""
 
 import math
-import re
 import threading
-from datetime import date, datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
 
 import requests
-from bs4 import BeautifulSoup
 from cls_thread import DaemonThread as Thread
 from mtgdc_carddata import DBCards
-from mtgdc_database import Cartes, Decks, Tournois, init_database, stmt_set_deck_carte
+from mtgdc_database import (
+    FINAL_REASONS,
+    RETRY_MAX_ATTEMPTS,
+    Cartes,
+    Decks,
+    Relances,
+    Tournois,
+    catalog_stamp,
+    due_retries,
+    init_database,
+    store_decklist,
+)
+from mtgdc_metrics import (
+    CARD_RESOLUTION_SECONDS,
+    DB_WRITE_SECONDS,
+    FETCH_SECONDS,
+    PARSE_SECONDS,
+    REQUESTS,
+    RETRIES,
+    ROWS_WRITTEN,
+    UNKNOWN_CARDS,
+)
+from mtgdc_parser import ENCODING, NO_COMMANDER, parse_decklist, parse_event
+from mtgdc_similarity import index_deck
+from sqlalchemy import delete, func
 
 CARDS = DBCards()
+MTGTOP8 = "https://mtgtop8.com"  # Remplacé par un serveur local pour les benchmarks
+ALREADY_STORED = "already_stored"  # Résultat du scrap d'un tournoi déjà en base
+RETRY_BACKOFF = 600  # Secondes avant la première relance d'un échec réseau
+RETRY_BACKOFF_MAX = 86400
 HEADERS = {
     "Access-Control-Allow-Origin": "*",
     "Access-Control-Allow-Methods": "GET",
@@ -24,38 +53,63 @@ HEADERS = {
 }
 
 
+def resolve_card(card_name: str) -> dict:
+    """Résolution instrumentée d'un nom de carte scrappé."""
+
+    with CARD_RESOLUTION_SECONDS.time():
+        card = CARDS.get(card_name)
+    if card.get("name", "Unknown Card") == "Unknown Card":
+        UNKNOWN_CARDS.inc()
+    return card
+
+
 class Soupe:
-    """Classe qui contient les informations pour le scrapping."""
+    """Classe qui contient les informations pour le scrapping.
+
+    Le téléchargement se fait dans le thread appelant ; le parsing aussi, ou
+    dans le pool de processus `pool` s'il est fourni.
+    """
 
-    def __init__(self, link: str) -> None:
+    def __init__(self, link: str, pool=None) -> None:
         self.link = link
-        self.soup = self.get_soup()
+        self.pool = pool
 
     @property
     def encoding(self):
         """Propriété qui retourne l'encoding du site mtgtop8."""
 
-        return "iso-8859-1"
+        return ENCODING
 
-    def get_soup(self) -> BeautifulSoup:
+    def fetch(self) -> bytes:
         """Fonction qui récupère la page demandée."""
 
-        req = requests.get(self.link, HEADERS, stream=True, timeout=5000)
-        req.encoding = self.encoding
-        return BeautifulSoup(req.content, "html.parser", from_encoding=self.encoding)
+        REQUESTS.inc()
+        with FETCH_SECONDS.time():
+            req = requests.get(self.link, HEADERS, stream=True, timeout=5000)
+            req.encoding = self.encoding
+            return req.content
+
+    def parse(self, parser, content: bytes) -> dict:
+        """Parsing de la page par une fonction de `mtgdc_parser`."""
+
+        with PARSE_SECONDS.time():
+            if self.pool is None:
+                return parser(content)
+            return self.pool.submit(parser, content).result()
 
 
 class MTGDeck(Soupe):
     """Classe pour représenter l'objet Deck."""
 
-    def __init__(self, deck_id: str) -> None:
+    def __init__(self, deck_id: str, pool=None) -> None:
         # C'est un appel "à blanc" du deck car j'ai observé que
         # si la page de deck n'était pas visitée au préalable,
         # l'exportation de la decklist ne fonctionnait pas correctement
-        Soupe(f"https://mtgtop8.com/event?e=1&d={deck_id}").soup
+        Soupe(f"{MTGTOP8}/event?e=1&d={deck_id}").fetch()
 
-        super().__init__(f"https://mtgtop8.com/mtgo?d={deck_id}")
+        super().__init__(f"{MTGTOP8}/mtgo?d={deck_id}", pool)
         self.id = deck_id
+        self.record = self.parse(parse_decklist, self.fetch())
 
         self.data = {
             "mainboard": [],
@@ -63,6 +117,7 @@ class MTGDeck(Soupe):
             "player": "",
             "rank": 0,
         }
+        self.unknown = []  # Noms scrappés absents du catalogue
 
     @property
     def to_dict(self) -> dict:
@@ -76,29 +131,20 @@ class MTGDeck(Soupe):
             "decklist": self.mainboard,
         }
 
-    @property
-    def decklist(self) -> str:
-        """Propriété retournant la decklist."""
-
-        return self.soup.prettify()
-
     @property
     def commander(self) -> list:
         """Propriété qui retourne le sideboard."""
 
         if len(self.data["sideboard"]) == 0:
-            if "Sideboard" not in self.decklist:
-                self.data["sideboard"] = ["Unknown Card"]
-            else:
-                self.data["sideboard"] = [
-                    line[2:].strip()
-                    for line in re.split("Sideboard", self.decklist)[1].split("\n")
-                    if len(line[2:].strip()) > 0
-                ]
+            if self.record["missing_commander"]:
+                # Export sans sideboard : rien à chercher dans le catalogue
+                self.data["sideboard"] = [NO_COMMANDER]
+                return self.data["sideboard"]
 
             # Make sure every card is properly typed
-            for idx, carte in enumerate(self.data["sideboard"]):
-                self.data["sideboard"][idx] = CARDS.get(carte)["name"]
+            self.data["sideboard"] = [
+                self._resolve(carte) for carte in self.record["commander"]
+            ]
 
         return self.data["sideboard"]
 
@@ -107,28 +153,25 @@ class MTGDeck(Soupe):
         """Propriété qui retourne le mainboard."""
 
         if len(self.data["mainboard"]) == 0:
-            if "Sideboard" not in self.decklist:
-                self.data["mainboard"] = [
-                    line.strip() for line in self.decklist.split("\n") if line.strip()
-                ]
-            else:
-                self.data["mainboard"] = [
-                    line.strip()
-                    for line in re.split("Sideboard", self.decklist)[0].split("\n")
-                    if line.strip()
-                ]
-
             # Clean card names in case of encoding errors
             lines = []
-            for line in self.data["mainboard"]:
+            for line in self.record["mainboard"]:
                 tmp = line.split(" ", maxsplit=1)
-                tmp[1] = CARDS.get(tmp[1])["name"]
+                tmp[1] = self._resolve(tmp[1])
                 lines.append(" ".join(tmp))
 
             self.data["mainboard"] = lines
 
         return self.data["mainboard"]
 
+    def _resolve(self, card_name: str) -> str:
+        """Nom de la carte en base, en relevant les noms non résolus."""
+
+        name = resolve_card(card_name).get("name", "Unknown Card")
+        if name == "Unknown Card":
+            self.unknown.append(card_name)
+        return name
+
     @property
     def rank(self) -> str:
         """Propriété pour gérer le rang du deck dans le tournoi."""
@@ -157,17 +200,18 @@ class MTGDeck(Soupe):
 class MTGTournoi(Soupe):
     """Classe pour représenter l'objet Tournoi."""
 
-    def __init__(self, link: str) -> None:
-        super().__init__(link)
-        self.soup = self.get_soup()
+    def __init__(self, link: str, pool=None) -> None:
+        super().__init__(link, pool)
         self.tournoi_id = link.split("=")[1]
-        self._is_commander = None
+        self.record = self.parse(parse_event, self.fetch())
         self.data = {
-            "name": "",
-            "place": "",
-            "players": 0,
-            "date": datetime(1993, 8, 5),
+            "name": self.record["name"],
+            "place": self.record["place"],
+            "players": self.record["players"],
+            "date": self.record["date"] or datetime(1993, 8, 5),
         }
+        self.unknown_cards = []  # Noms non résolus, tous decks confondus
+        self.missing_commander = []  # Decks exportés sans commandant
 
     @property
     def to_dict(self) -> dict:
@@ -186,91 +230,65 @@ class MTGTournoi(Soupe):
 
     @property
     def is_commander(self) -> bool:
-        """Propriété qui vérifie que la soupe contient un tournoi en Duel Commander."""
+        """Propriété qui vérifie que la page contient un tournoi en Duel Commander."""
 
-        if self._is_commander is None:
-            tag = self.soup.find("div", class_="meta_arch")
-            self._is_commander = tag is not None and "Duel Commander" in tag.text
-        return self._is_commander
+        return self.record["is_commander"]
 
     @property
     def name(self) -> str:
         """Propriété qui retourne le nom de l'événement."""
 
-        if self.data["name"] == "":
-            self._set_name_place()
         return self.data["name"]
 
     @property
     def place(self) -> str:
         """Propriété qui retour le lieu de l'événement."""
 
-        # Le lieu n'est pas toujours indiqué mais le nom l'est toujours
-        if self.data["place"] == "" and self.data["players"] == 0:
-            self._set_name_place()
         return self.data["place"]
 
     @property
     def players(self) -> str:
         """Propriété qui retourne le nombre de joueurs."""
 
-        if self.data["players"] == 0:
-            self._set_players_date()
         return self.data["players"]
 
     @property
     def date(self) -> str:
         """Propriété qui retourne la date de l'événement."""
 
-        if self.data["date"] == datetime(1993, 8, 5):
-            self._set_players_date()
         return self.data["date"]
 
     @property
     def decks(self) -> list[MTGDeck]:
         """Propriété qui retourne la liste des decks de la page."""
 
-        top8_decks = [
-            (tag, "top8") for tag in self.soup.select("div.S14 a[href^='?e=']")
-        ]
-        out_decks = [(tag, "out") for tag in self.soup.select("optgroup option")]
-        decks_to_crawl = top8_decks + out_decks
-
         # Stockage des decks
         response = []
-        deck_ids = []  # Cas de nesting de balise dans certains tournois
+        errors = []
+        lock = threading.Lock()
 
-        def get_deck_info(deck, option, lock):
+        def get_deck_info(deck_id, rank, player):
             """Procédure appelée lors du threading."""
-            if option == "top8":
-                rdeck = MTGDeck(re.split("=", deck["href"])[2][:-2])
-                block = deck.parent.parent.parent
-                try:
-                    rdeck.player = block.find(
-                        "a", attrs={"class": "player"}
-                    ).string.strip()
-                except AttributeError:
-                    return
-                for div in block.find_all("div"):
-                    if div.string is not None:
-                        if re.match(r"\d(?:-\d)?", div.string):
-                            rdeck.rank = div.string
-
-            if option == "out" and deck["value"] not in deck_ids:
-                rdeck = MTGDeck(deck["value"])
-                rdeck.player = re.split(" - ", deck.contents[0], maxsplit=1)[1].strip()
-                rdeck.rank = re.split("#", deck.parent["label"], maxsplit=1)[1]
+            try:
+                rdeck = MTGDeck(deck_id, self.pool)
+                rdeck.rank = rank
+                rdeck.player = player
+                deck = rdeck.to_dict
+            except Exception as error:
+                # Remontée au thread du tournoi : un deck manquant l'invalide
+                with lock:
+                    errors.append(error)
+                return
 
             with lock:
-                deck_ids.append(rdeck.id)
-                response.append(rdeck.to_dict)
+                response.append(deck)
+                self.unknown_cards.extend(rdeck.unknown)
+                if rdeck.record["missing_commander"]:
+                    self.missing_commander.append(deck_id)
 
         threads = [
-            Thread(
-                target=get_deck_info,
-                args=(item[0], item[1], threading.Lock()),
-            )
-            for item in decks_to_crawl
+            Thread(target=get_deck_info, args=deck_ref)
+            for deck_ref in self.record["decks"]
         ]
 
         for thread in threads:
@@ -279,66 +297,119 @@ class MTGTournoi(Soupe):
         for thread in threads:
             thread.join()
 
+        if errors:
+            raise errors[0]
+
         response = [item for item in response if item is not None]
         response = sorted(response, key=lambda i: int(i["id"]))
 
         return response
 
-    def _set_name_place(self) -> None:
-        """Fonction qui récupère le nom et le lieu depuis la soupe."""
-
-        tag = self.soup.find("div", class_="event_title")
-        if tag is not None:
-            if "@" not in tag.text:
-                self.data["name"] = tag.text
-            else:
-                (name, place) = re.split("@", tag.text, maxsplit=1)
-                self.data["name"] = name.strip()
-                self.data["place"] = place.strip()
-
-    def _set_players_date(self) -> None:
-        """fonction qui récupère le nombre de joueurs et la date depuis la soupe."""
-
-        div_meta_arch = self.soup.find("div", class_="meta_arch")
-        if div_meta_arch:
-            tags = div_meta_arch.parent.find_all("div")
-            for tag in tags:
-                line = "".join(tag.text)
-                if re.match(r"[0-9][0-9]/[0-9][0-9]", line) and "-" not in line:
-                    self.data["date"] = datetime.strptime(line, "%d/%m/%y")
-                elif "players" in line and "-" not in line:
-                    self.data["players"] = int(
-                        line.strip().split(" ", maxsplit=1)[0].strip()
-                    )
-                elif "players" in line and "-" in line:
-                    (players, date) = re.split("-", line)
-                    self.data["players"] = int(
-                        players.strip().split(" ", maxsplit=1)[0].strip()
-                    )
-                    self.data["date"] = datetime.strptime(
-                        date.strip(), "%d/%m/%y"
-                    ).date()
-
 
 def last_tournament_scrapped():
     """Retourne le dernier id de tournoi scrappé."""
 
     session = init_database()
+    last_id = session.query(func.max(Tournois.id)).scalar()
+    session.close()
 
-    tournaments = session.query(Tournois).all()
-    if len(tournaments) == 0:
+    if last_id is None:
         return 2695 - 1  # Premier tournoi DC sur mtgtop8 : 2695
 
-    return max([tournament.id for tournament in tournaments])
+    return last_id
+
 
+def queue_failure(
+    tournament_id: int, reason: str, error: str = "", unknown_cards: list = ()
+) -> None:
+    """Mise en file de relance d'un tournoi en échec.
+
+    Un échec pour carte inconnue attend une mise à jour du catalogue ; les
+    autres (network, error, missing_commander) sont relancés après un backoff
+    qui double à chaque tentative. Un export sans commandant est abandonné
+    après `RETRY_MAX_ATTEMPTS` tentatives : la ligne reste, sans relance.
+    """
+
+    session = init_database()
+    if session.get(Tournois, tournament_id) is not None:
+        # Rien à relancer : le tournoi est déjà en base
+        session.execute(delete(Relances).where(Relances.tournoi_id == tournament_id))
+        session.commit()
+        session.close()
+        return
+
+    now = datetime.now()
+    stamp = catalog_stamp(session)
+
+    entry = session.get(Relances, tournament_id)
+    if entry is None:
+        entry = Relances(tournoi_id=tournament_id, attempts=0)
+        session.add(entry)
+    entry.attempts += 1
+    entry.reason = reason
+    entry.error = error
+    entry.unknown_cards = sorted(set(unknown_cards))
+    entry.catalog_stamp = stamp
+    entry.failed_at = now
+    if reason == "unknown_card":
+        entry.retry_at = None
+    elif reason in FINAL_REASONS and entry.attempts >= RETRY_MAX_ATTEMPTS:
+        entry.retry_at = None  # Abandon
+    else:
+        backoff = min(RETRY_BACKOFF * 2 ** (entry.attempts - 1), RETRY_BACKOFF_MAX)
+        entry.retry_at = now + timedelta(seconds=backoff)
+
+    session.commit()
+    session.close()
+
+
+def dequeue(tournament_id: int) -> None:
+    """Retrait d'un tournoi de la file de relance."""
 
-def scrap_mtgtop8(span: int = 100, label=None, display=None):
-    """Fonction asynchrone pour le scrapping de MTGTOP8."""
+    session = init_database()
+    session.execute(delete(Relances).where(Relances.tournoi_id == tournament_id))
+    session.commit()
+    session.close()
+
+
+def scrap_mtgtop8(
+    span: int = 100,
+    label=None,
+    display=None,
+    concurrency: int = 10,
+    from_id: int = None,
+    processes: int = 0,
+    retry: str = "due",
+) -> dict:
+    """Fonction asynchrone pour le scrapping de MTGTOP8.
+
+    Les tournois visités sont ceux qui suivent `from_id` (par défaut le dernier
+    tournoi en base). Avec `processes`, le parsing des pages est confié à un
+    pool de processus et les threads ne font plus que les requêtes.
+    Les tournois de la file de relance sont visités d'abord : ceux qui sont dus
+    (`retry="due"`), tous (`"all"`) ou aucun (`"none"`).
+    Retourne les statistiques du run.
+    """
 
     CARDS.helpers()  # Refresh the helpers
+    CARDS.cache.reset_stats()
+
+    # Processus neufs : un fork hériterait des threads et verrous en cours
+    pool = (
+        ProcessPoolExecutor(processes, mp_context=get_context("spawn"))
+        if processes
+        else None
+    )
 
     def execute_scrap(tournament_id: int, label, display):
-        tournament = MTGTournoi(f"https://mtgtop8.com/event?e={tournament_id}")
+        session = init_database()
+        stored = session.get(Tournois, tournament_id) is not None
+        session.close()
+        if stored:
+            # Tournoi déjà en base (--from-id en deçà du dernier tournoi)
+            return ALREADY_STORED
+
+        tournament = MTGTournoi(f"{MTGTOP8}/event?e={tournament_id}", pool)
 
         tournament_date = (
             tournament.date
@@ -346,70 +417,199 @@ def scrap_mtgtop8(span: int = 100, label=None, display=None):
             else tournament.date.date()
         )
         if tournament.is_commander and tournament_date > datetime(1993, 8, 5).date():
-            session = init_database()
-
-            tournament_data = {
-                "id": tournament.tournoi_id,
-                "name": tournament.name,
-                "place": tournament.place,
-                "players": tournament.players,
-                "date": tournament_date,
-            }
-            new_tournament = Tournois(**tournament_data)
-            session.add(new_tournament)
-
-            for deck in tournament.decks:
-                deck_data = {
-                    "id": deck["id"],
-                    "tournoi_id": tournament.tournoi_id,
-                    "rank": deck["rank"],
-                    "player": deck["player"],
-                }
-                new_deck = Decks(**deck_data)
-                session.add(new_deck)
-
+            decks = tournament.decks
+            if tournament.missing_commander:
+                # Export incomplet côté mtgtop8 : relancé après un backoff
+                queue_failure(
+                    int(tournament.tournoi_id),
+                    "missing_commander",
+                    "Decks sans commandant : "
+                    + ", ".join(sorted(tournament.missing_commander)),
+                )
+                return False
+
+            for deck in decks:
                 card_names = [
                     line.split(" ", maxsplit=1)[1] for line in deck["decklist"]
                 ]
                 if "Unknown Card" in (card_names + deck["commander"]):
-                    session.rollback()
-                    session.close()
+                    queue_failure(
+                        int(tournament.tournoi_id),
+                        "unknown_card",
+                        unknown_cards=tournament.unknown_cards,
+                    )
                     return False
 
-                for card_name in deck["commander"]:
-                    card = session.query(Cartes).filter_by(name=card_name).first()
-                    new_deck.commanders.append(card)
-
-                cards = session.query(Cartes).filter(Cartes.name.in_(card_names)).all()
-                card_dict = {card.name: card for card in cards}
-                for line in deck["decklist"]:
-                    qty, card_name = line.split(" ", maxsplit=1)
-                    card = card_dict.get(card_name)
-
-                    if card:
-                        session.execute(stmt_set_deck_carte(new_deck, card, int(qty)))
-
-            session.commit()
-            session.close()
+            # Toute l'écriture est mesurée : les decks et l'index sont envoyés
+            # à la base par l'autoflush des requêtes, avant le commit
+            session = init_database()
+            try:
+                with DB_WRITE_SECONDS.time():
+                    tournament_data = {
+                        "id": tournament.tournoi_id,
+                        "name": tournament.name,
+                        "place": tournament.place,
+                        "players": tournament.players,
+                        "date": tournament_date,
+                    }
+                    new_tournament = Tournois(**tournament_data)
+                    session.add(new_tournament)
+
+                    for deck in decks:
+                        deck_data = {
+                            "id": deck["id"],
+                            "tournoi_id": tournament.tournoi_id,
+                            "rank": deck["rank"],
+                            "player": deck["player"],
+                        }
+
+                        card_names = [
+                            line.split(" ", maxsplit=1)[1] for line in deck["decklist"]
+                        ]
+                        commanders = []
+                        for card_name in deck["commander"]:
+                            card = (
+                                session.query(Cartes).filter_by(name=card_name).first()
+                            )
+                            if card:
+                                commanders.append(card)
+
+                        cards = (
+                            session.query(Cartes)
+                            .filter(Cartes.name.in_(card_names))
+                            .all()
+                        )
+                        card_dict = {card.name: card for card in cards}
+                        decklist = []
+                        for line in deck["decklist"]:
+                            qty, card_name = line.split(" ", maxsplit=1)
+                            card = card_dict.get(card_name)
+
+                            if card:
+                                decklist.append((card, int(qty)))
+
+                        # Les listes déjà rencontrées ne sont pas réécrites
+                        deck_data["decklist_id"] = store_decklist(
+                            session, commanders, decklist
+                        )
+                        new_deck = Decks(**deck_data)
+                        session.add(new_deck)
+
+                        index_deck(session, new_deck.id, card_names + deck["commander"])
+
+                    session.execute(
+                        delete(Relances).where(
+                            Relances.tournoi_id == int(tournament.tournoi_id)
+                        )
+                    )
+                    session.commit()
+            finally:
+                session.close()
+            ROWS_WRITTEN.inc(1 + len(decks))
 
             if label:
                 label()
             if display:
                 display()
 
-    tournament_id = last_tournament_scrapped()
+            return len(decks)
+
+    stats = {
+        "scanned": 0,
+        "stored": 0,
+        "decks": 0,
+        "rejected": 0,  # Tournois annulés pour carte inconnue
+        "skipped": 0,  # Tournois déjà en base, ni visités ni réécrits
+        "failures": 0,  # Tournois en erreur (réseau, parsing...)
+        "errors": [],
+        "retried": 0,  # Tournois de la file de relance visités
+        "recovered": 0,  # Dont tournois mis en base
+    }
+    lock = threading.Lock()
 
-    for loop in range(math.ceil(span // 10)):
-        threads = [
-            Thread(
-                target=execute_scrap,
-                args=((tournament_id + 1 + i + loop * 10), label, display),
+    session = init_database()
+    retry_ids = set()
+    if retry != "none":
+        retry_ids = set(due_retries(session, datetime.now(), force=retry == "all"))
+    session.close()
+
+    def count_scrap(tournament_id: int, label, display):
+        """Exécution du scrap d'un tournoi et mise à jour des statistiques."""
+        retried = tournament_id in retry_ids
+        if retried:
+            RETRIES.inc()
+        try:
+            result = execute_scrap(tournament_id, label, display)
+        except Exception as error:
+            reason = (
+                "network" if isinstance(error, requests.RequestException) else "error"
             )
-            for i in range(10)
+            queue_failure(tournament_id, reason, repr(error))
+            with lock:
+                stats["scanned"] += 1
+                stats["retried"] += retried
+                stats["failures"] += 1
+                stats["errors"].append(
+                    {"id": tournament_id, "reason": reason, "error": repr(error)}
+                )
+            return
+
+        if retried and result in (None, ALREADY_STORED):
+            dequeue(tournament_id)  # Ce n'est plus un tournoi à mettre en base
+
+        with lock:
+            stats["scanned"] += 1
+            stats["retried"] += retried
+            if result is False:
+                stats["rejected"] += 1
+            elif result is ALREADY_STORED:
+                stats["skipped"] += 1
+            elif result is not None:
+                stats["stored"] += 1
+                stats["recovered"] += retried
+                stats["decks"] += result
+
+    def run_batches(tournament_ids: list) -> None:
+        """Scrap des tournois par groupes de `concurrency` threads."""
+        for loop in range(math.ceil(len(tournament_ids) / concurrency)):
+            threads = [
+                Thread(target=count_scrap, args=(tournament_id, label, display))
+                for tournament_id in tournament_ids[
+                    loop * concurrency : (loop + 1) * concurrency
+                ]
+            ]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+    tournament_id = last_tournament_scrapped() if from_id is None else from_id
+    start = time.perf_counter()
+
+    run_batches(sorted(retry_ids))
+    run_batches(
+        [
+            tournament_id + 1 + i
+            for i in range(span)
+            if tournament_id + 1 + i not in retry_ids
         ]
+    )
 
-        for thread in threads:
-            thread.start()
+    if pool:
+        pool.shutdown()
 
-        for thread in threads:
-            thread.join()
+    # Les noms résolus hors du catalogue le seront directement au prochain run
+    CARDS.save_aliases()
+    stats["card_cache"] = CARDS.cache.stats()
+
+    session = init_database()
+    stats["queued"] = session.query(func.count(Relances.tournoi_id)).scalar()
+    session.close()
+
+    stats["elapsed"] = time.perf_counter() - start
+    stats["decks_per_sec"] = (
+        stats["decks"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    )
+    return stats
@@ -0,0 +1,250 @@
+"""Module de recherche de decks similaires (MinHash et LSH)."""
+
+import hashlib
+import random
+import time
+from array import array
+from collections.abc import Iterable
+
+from mtgdc_database import (
+    Cartes,
+    Decks,
+    decklists_cartes,
+    decklists_commanders,
+    decks_signatures,
+    init_database,
+    lsh_buckets,
+)
+from sqlalchemy import delete, func, insert, select
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS  # Seuil de similarité ~ (1 / BANDS) ** (1 / ROWS) = 0.42
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+MAX_BUCKET = (1 << 63) - 1  # Les entiers SQLite sont signés sur 64 bits
+
+# Graine fixe : les signatures en base doivent rester comparables entre deux runs
+_generator = random.Random(2695)
+PERMUTATIONS = [
+    (
+        _generator.randint(1, MERSENNE_PRIME - 1),
+        _generator.randint(0, MERSENNE_PRIME - 1),
+    )
+    for _ in range(NUM_PERM)
+]
+
+
+def _hash(value: bytes) -> int:
+    """Hash stable (contrairement à `hash`) d'une valeur sur 8 octets."""
+
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "little")
+
+
+def card_names(decklist: list) -> set:
+    """Noms des cartes d'une liste ("1 Sol Ring" ou "Sol Ring")."""
+
+    names = set()
+    for line in decklist:
+        tmp = line.strip().split(" ", maxsplit=1)
+        names.add(tmp[1] if len(tmp) == 2 and tmp[0].isdigit() else line.strip())
+    return names
+
+
+def signature(names: set) -> array:
+    """Calcul de la signature MinHash d'un ensemble de noms de cartes."""
+
+    hashes = [_hash(name.encode()) & MAX_HASH for name in names]
+    if len(hashes) == 0:
+        return array("I", [MAX_HASH] * NUM_PERM)
+
+    return array(
+        "I",
+        [
+            min(((a * value + b) % MERSENNE_PRIME) & MAX_HASH for value in hashes)
+            for a, b in PERMUTATIONS
+        ],
+    )
+
+
+def jaccard(set_a: set, set_b: set) -> float:
+    """Indice de Jaccard exact entre deux ensembles."""
+
+    union = len(set_a | set_b)
+    return len(set_a & set_b) / union if union else 0.0
+
+
+def band_keys(sig: array) -> list:
+    """Clés LSH d'une signature : une par bande de `ROWS` valeurs."""
+
+    return [
+        _hash(bytes([band]) + sig[band * ROWS : (band + 1) * ROWS].tobytes())
+        & MAX_BUCKET
+        for band in range(BANDS)
+    ]
+
+
+def index_deck(session, deck_id: int, names) -> None:
+    """Enregistre la signature et les buckets LSH du deck (sans commit)."""
+
+    sig = signature(set(names))
+    session.execute(
+        delete(decks_signatures).where(decks_signatures.c.deck_id == deck_id)
+    )
+    session.execute(delete(lsh_buckets).where(lsh_buckets.c.deck_id == deck_id))
+    session.execute(
+        insert(decks_signatures).values(deck_id=deck_id, signature=sig.tobytes())
+    )
+    session.execute(
+        insert(lsh_buckets),
+        [{"bucket": key, "deck_id": deck_id} for key in set(band_keys(sig))],
+    )
+
+
+def deck_card_names(session, deck_ids=None) -> dict:
+    """Noms des cartes (commandants compris) des decks en base."""
+
+    decks = {}
+    for table in (decklists_cartes, decklists_commanders):
+        stmt = (
+            select(Decks.id, Cartes.name)
+            .join(table, table.c.decklist_id == Decks.decklist_id)
+            .join(Cartes, Cartes.id == table.c.carte_id)
+        )
+        if deck_ids is not None:
+            stmt = stmt.where(Decks.id.in_(deck_ids))
+        for deck_id, name in session.execute(stmt):
+            decks.setdefault(deck_id, set()).add(name)
+    return decks
+
+
+def reindex_decks() -> int:
+    """Calcule les signatures manquantes des decks déjà en base."""
+
+    session = init_database()
+    indexed = select(decks_signatures.c.deck_id)
+    stmt = select(Decks.id).where(Decks.id.not_in(indexed))
+    deck_ids = {deck_id for (deck_id,) in session.execute(stmt)}
+
+    decks = deck_card_names(session, deck_ids)
+    for deck_id, names in decks.items():
+        index_deck(session, deck_id, names)
+
+    session.commit()
+    session.close()
+    return len(decks)
+
+
+def _deck_id(deck):
+    """Id du deck demandé, ou None si `deck` est une decklist.
+
+    Les ids de deck du scrapper sont des chaînes de chiffres ("100") : elles
+    sont acceptées comme des entiers.
+    """
+
+    if isinstance(deck, bool):
+        raise TypeError(f"Deck invalide : {deck!r}")
+    if isinstance(deck, int):
+        return deck
+    if isinstance(deck, str):
+        if deck.strip().isdigit():
+            return int(deck)
+        raise TypeError(f"Id de deck invalide : {deck!r}")
+    if isinstance(deck, Iterable):
+        return None
+    raise TypeError(f"Deck invalide : {deck!r}")
+
+
+def similar_decks(deck, k: int = 10) -> list:
+    """Retourne les `k` decks les plus proches sous la forme (deck_id, jaccard).
+
+    `deck` est soit l'id d'un deck en base, soit une decklist.
+    """
+
+    deck_id = _deck_id(deck)
+    session = init_database()
+    if deck_id is not None:
+        names = deck_card_names(session, [deck_id]).get(deck_id, set())
+    else:
+        names = card_names(deck)
+
+    # Les candidats partagent au moins une bande avec la requête
+    stmt = (
+        select(lsh_buckets.c.deck_id)
+        .where(lsh_buckets.c.bucket.in_(band_keys(signature(names))))
+        .distinct()
+    )
+    if deck_id is not None:
+        stmt = stmt.where(lsh_buckets.c.deck_id != deck_id)
+    candidates = [deck_id for (deck_id,) in session.execute(stmt)]
+
+    # Classement des seuls candidats selon l'indice de Jaccard exact
+    decks = deck_card_names(session, candidates)
+    session.close()
+
+    scores = [(deck_id, jaccard(names, others)) for deck_id, others in decks.items()]
+    return sorted(scores, key=lambda item: (-item[1], item[0]))[:k]
+
+
+def brute_force_similar_decks(deck, k: int = 10) -> list:
+    """Référence exacte : comparaison deux à deux avec tous les decks en base."""
+
+    deck_id = _deck_id(deck)
+    session = init_database()
+    decks = deck_card_names(session)
+    session.close()
+
+    if deck_id is not None:
+        names = decks.pop(deck_id, set())
+    else:
+        names = card_names(deck)
+
+    scores = [(deck_id, jaccard(names, others)) for deck_id, others in decks.items()]
+    scores = [item for item in scores if item[1] > 0]
+    return sorted(scores, key=lambda item: (-item[1], item[0]))[:k]
+
+
+def benchmark(samples: int = 20, k: int = 10) -> dict:
+    """Compare la recherche LSH avec la recherche exacte sur des decks en base."""
+
+    session = init_database()
+    nb_decks = session.execute(
+        select(func.count()).select_from(decks_signatures)
+    ).scalar()
+    deck_ids = [
+        deck_id
+        for (deck_id,) in session.execute(
+            select(decks_signatures.c.deck_id).order_by(func.random()).limit(samples)
+        )
+    ]
+    session.close()
+
+    timings = {"lsh": 0.0, "brute_force": 0.0}
+    recall = []
+    for deck_id in deck_ids:
+        start = time.perf_counter()
+        approx = similar_decks(deck_id, k)
+        timings["lsh"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        exact = brute_force_similar_decks(deck_id, k)
+        timings["brute_force"] += time.perf_counter() - start
+
+        expected = {item[0] for item in exact}
+        if expected:
+            recall.append(len(expected & {item[0] for item in approx}) / len(expected))
+
+    return {
+        "decks": nb_decks,
+        "samples": len(deck_ids),
+        "lsh_ms": 1000 * timings["lsh"] / max(len(deck_ids), 1),
+        "brute_force_ms": 1000 * timings["brute_force"] / max(len(deck_ids), 1),
+        "recall": sum(recall) / len(recall) if recall else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    print("Decks indexés :", reindex_decks())
+    for key, value in benchmark().items():
+        print(f"{key}: {value}")
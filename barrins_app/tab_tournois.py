@@ -1,15 +1,30 @@
 """Onglet pour l'extraction et l'affichage des tournois depuis mtgtop8."""
 
-import threading
+import queue
+from datetime import datetime
 from tkinter import ttk
 
 from cls_thread import DaemonThread as Thread
+from mtgdc_browser import TournamentBrowser
 from mtgdc_carddata import DBCards, init_cards, init_sets
 from mtgdc_database import Decks, Tournois, init_database
 from mtgdc_scrapper import last_tournament_scrapped, scrap_mtgtop8
+from sqlalchemy.orm import joinedload
 
 CARDS = DBCards()
 
+# Tournois par page et colonnes du tableau triables par la base
+PAGE_SIZE = 100
+SORTS = {"col1": "name", "col2": "date", "col3": "players"}
+
+# Période de lecture des événements d'avancement de l'extraction
+PROGRESS_MS = 100
+
+# Insertion dans le Treeview par lots, depuis le thread Tk uniquement
+BATCH_SIZE = 50
+BATCHES_PER_TICK = 4
+TICK_MS = 20
+
 
 class TournoisTab(ttk.Frame):
     """Onglet tournois."""
@@ -54,7 +69,7 @@ class TournoisTab(ttk.Frame):
 
         scrap_mtgtop8(
             2000,
-            label=self.f_extract.update_label,
+            label=self.f_extract.notify_scraped,
             display=self.f_display.insert_last_tournament,
         )
 
@@ -87,41 +102,88 @@ class ExtractMtgTop8(ttk.Labelframe):
         self.last_tournament_label.grid(row=0, column=1, sticky="ew", padx=20)
         self.update_label()
 
-        # Message sur freeze pendant DB update
-        self.warning_message = ttk.Label(
+        # Avancement de la mise à jour hebdomadaire et de l'extraction
+        self.progress_message = ttk.Label(
             self,
-            text=(
-                "This software updates its MTG database once every week. "
-                + "During this update, it may freeze due to heavy payload."
-            ),
+            text="MTG data is updated once every week, before extraction.",
             font=("Arial", 10, "italic"),
             anchor="center",
         )
-        self.warning_message.grid(row=1, column=0, columnspan=2, sticky="ew", padx=20)
+        self.progress_message.grid(row=1, column=0, columnspan=2, sticky="ew", padx=20)
 
-        # Threads de la zone
-        self.extract_mtgtop8_thread = Thread(target=self.parent.mtgtop8_extraction)
-        self.init_sets_thread = threading.Thread(target=init_sets)
-        self.init_cards_thread = threading.Thread(target=init_cards)
+        # Thread de la zone, qui communique avec Tk par la file d'événements
+        self.extraction_thread = None
+        self.progress = queue.Queue()
+        self.after(PROGRESS_MS, self.poll_progress)
 
     def start_extraction(self):
         """Action du bouton."""
 
-        self.extract_button.configure(state="disabled")
-
-        # Contrôle que les data sont à jour
-        self.init_sets_thread.start()
-        self.init_cards_thread.start()
-        self.extract_button.configure(text="Updating MTG Data")
-        self.init_sets_thread.join()
-        self.init_cards_thread.join()
-        self.extract_button.configure(text="MTG Data Updated")
-
-        CARDS.helpers()
-
-        # Extraction MtgTop8
-        self.extract_button.configure(text="Scrapping...")
-        self.extract_mtgtop8_thread.start()
+        self.extract_button.configure(state="disabled", text="Updating MTG Data")
+        # Nouveau thread à chaque clic : le bouton revient après une erreur
+        self.extraction_thread = Thread(target=self.refresh_and_extract)
+        self.extraction_thread.start()
+
+    def refresh_and_extract(self):
+        """Mise à jour des données MTG puis extraction, hors du thread Tk."""
+
+        try:
+            # Les sets d'abord : l'ajout des cartes peut en dépendre
+            init_sets(self.progress.put)
+            init_cards(self.progress.put)
+            self.progress.put({"stage": "helpers"})
+            CARDS.helpers()
+
+            # Extraction MtgTop8
+            self.progress.put({"stage": "scrap"})
+            self.parent.mtgtop8_extraction()
+            self.progress.put({"stage": "done"})
+        except Exception as error:
+            print("Erreur de la mise à jour :", repr(error))
+            self.progress.put({"stage": "error", "error": str(error) or repr(error)})
+
+    def notify_scraped(self):
+        """Signalement d'un tournoi ajouté, depuis un thread de scrapping."""
+
+        self.progress.put({"stage": "scraped"})
+
+    def poll_progress(self):
+        """Affichage des événements d'avancement, appelée périodiquement par Tk."""
+
+        while True:
+            try:
+                event = self.progress.get_nowait()
+            except queue.Empty:
+                break
+
+            if event["stage"] == "download":
+                done, total = event["done"] / 1e6, event["total"] / 1e6
+                text = f"Downloading {event['name']}: {done:.1f}"
+                text += f" / {total:.1f} MB" if total else " MB"
+                self.progress_message.configure(text=text)
+            elif event["stage"] == "load":
+                self.progress_message.configure(text=f"Reading {event['name']}...")
+            elif event["stage"] == "upgrade":
+                self.progress_message.configure(
+                    text=f"{event['name']}: {event['done']} / {event['total']} parsed,"
+                    + f" {event['written']} rows written"
+                )
+            elif event["stage"] == "helpers":
+                self.extract_button.configure(text="MTG Data Updated")
+                self.progress_message.configure(text="Loading card catalog...")
+            elif event["stage"] == "scrap":
+                self.extract_button.configure(text="Scrapping...")
+                self.progress_message.configure(text="Scrapping mtgtop8...")
+            elif event["stage"] == "scraped":
+                self.update_label()
+            elif event["stage"] == "done":
+                self.extract_button.configure(text="Extraction done")
+                self.progress_message.configure(text="Database is up to date.")
+            elif event["stage"] == "error":
+                self.extract_button.configure(state="normal", text="Extraction")
+                self.progress_message.configure(text=f"Update failed: {event['error']}")
+
+        self.after(PROGRESS_MS, self.poll_progress)
 
     def update_label(self):
         """Mise à jour du label de résumé d'extraction."""
@@ -143,14 +205,10 @@ class DisplayMtgTop8(ttk.Labelframe):
     """Affichage des tournois et decks en base de données."""
 
     def __init__(self, parent) -> None:
-        nb_decks = self.get_nb_decks()
-        text = (
-            f"Database display (last 100 out of {nb_decks} tournaments)"
-            if nb_decks > 100
-            else f"Database display (last {nb_decks} tournaments)"
-        )
+        super().__init__(parent, text="Database display")
 
-        super().__init__(parent, text=text)
+        # Pagination et tri des tournois faits par la base
+        self.browser = TournamentBrowser(PAGE_SIZE)
 
         # Configuration de la grille
         self.grid(
@@ -171,72 +229,204 @@ class DisplayMtgTop8(ttk.Labelframe):
         self.tableau.column("col3", width=int(base_width * 3 / 27))
 
         # Nom des colonnes
-        self.sorting_states = {col: True for col in ["col1", "col2", "col3"]}
         self.tableau.heading("col1", text="Name", command=lambda: self.sort_c("col1"))
         self.tableau.heading("col2", text="Date", command=lambda: self.sort_c("col2"))
         self.tableau.heading("col3", text="Size", command=lambda: self.sort_c("col3"))
 
-    def sort_c(self, col):
-        """Fonction pour tri des colonnes."""
+        # Navigation entre les pages
+        self.f_pages = ttk.Frame(self)
+        self.f_pages.grid(row=1, column=0, sticky="ew", padx=5, pady=5)
+        self.previous_button = ttk.Button(
+            self.f_pages,
+            text="< Previous",
+            command=lambda: self.change_page(self.browser.previous_page),
+        )
+        self.previous_button.pack(side="left")
+        self.next_button = ttk.Button(
+            self.f_pages,
+            text="Next >",
+            command=lambda: self.change_page(self.browser.next_page),
+        )
+        self.next_button.pack(side="left")
+        self.date_button = ttk.Button(
+            self.f_pages, text="Go to date", command=self.go_to_date
+        )
+        self.date_button.pack(side="right")
+        self.date_entry = ttk.Entry(self.f_pages, width=12)
+        self.date_entry.insert(0, "YYYY-MM-DD")
+        self.date_entry.pack(side="right", padx=5)
 
-        items = [(self.tableau.set(k, col), k) for k in self.tableau.get_children("")]
-        reverse = self.sorting_states[col]
+        # Les decks d'un tournoi ne sont chargés qu'au dépliage du noeud
+        self.loaded_tournaments = set()
+        self.tableau.bind("<<TreeviewOpen>>", self.on_open)
 
-        if col == "col3":
-            items.sort(key=lambda x: int(x[0]), reverse=reverse)
-        else:
-            items.sort(reverse=reverse)
+        # Les threads de chargement déposent ici les mises à jour du tableau
+        self.pending = queue.Queue()
+        self.after(TICK_MS, self.process_pending)
+
+    def sort_c(self, col):
+        """Fonction pour tri des colonnes, exécuté par la base."""
 
-        for index, (val, k) in enumerate(items):
-            self.tableau.move(k, "", index)
+        self.change_page(lambda: self.browser.sort_by(SORTS[col]))
 
-        self.sorting_states[col] = not reverse
-        self.tableau.heading(col, command=lambda: self.sort_c(col))
+    def go_to_date(self):
+        """Affichage de la page contenant la date saisie."""
 
-    def get_nb_decks(self):
-        """Nombre de decks en ligne."""
+        try:
+            day = datetime.strptime(self.date_entry.get().strip(), "%Y-%m-%d").date()
+        except ValueError:
+            return
+        self.change_page(lambda: self.browser.jump_to_date(day))
 
-        session = init_database()
-        tournois = session.query(Tournois).order_by(Tournois.id.asc()).all()
-        return len(tournois)
+    def change_page(self, fetch):
+        """Chargement d'une page en arrière-plan."""
+
+        Thread(target=self.load_page, args=(fetch,)).start()
 
     def load_data(self):
         """Récupération des tournois et affichage dans le tableau."""
 
-        session = init_database()
-        tournois = session.query(Tournois).order_by(Tournois.id.desc()).limit(100).all()
-        for tournoi in reversed(tournois):
-            self.display_tournament(tournoi)
+        self.load_page(self.browser.first_page)
+
+    def load_page(self, fetch):
+        """Récupération d'une page de tournois et affichage dans le tableau."""
+
+        tournois = fetch()
+        total = self.browser.count()
+        position = self.browser.position()
+
+        text = (
+            f"Database display ({position + 1}-{position + len(tournois)}"
+            + f" out of {total} tournaments)"
+            if tournois
+            else f"Database display ({total} tournaments)"
+        )
+        self.pending.put((self.clear_page, (text,)))
+        self.enqueue_tournaments(reversed(tournois))
 
     def insert_last_tournament(self):
         """Insertion du dernier tournoi scrappé."""
 
         session = init_database()
         tournoi = session.query(Tournois).order_by(Tournois.date.desc()).first()
-        self.display_tournament(tournoi)
+        self.enqueue_tournaments([tournoi])
+        session.close()
+
+    def enqueue_tournaments(self, tournois: list):
+        """Préparation des lignes de tournois pour le thread Tk."""
+
+        rows = [
+            (tournoi.id, (tournoi.name, tournoi.date, tournoi.players))
+            for tournoi in tournois
+        ]
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start : start + BATCH_SIZE]
+            self.pending.put((self.display_tournaments, (batch,)))
+
+    def on_open(self, event):
+        """Chargement des decks au premier dépliage d'un tournoi."""
 
-    def display_tournament(self, tournoi: Tournois):
-        """Affichage du tournoi et des decks liés."""
+        iid = self.tableau.focus()
+        if self.tableau.parent(iid) != "" or iid in self.loaded_tournaments:
+            return
+
+        self.loaded_tournaments.add(iid)
+        Thread(target=self.load_decks, args=(int(iid),)).start()
+
+    def load_decks(self, tournoi_id: int):
+        """Récupération des decks et commandants du tournoi en une requête."""
+
+        session = init_database()
+        decks = (
+            session.query(Decks)
+            .options(joinedload(Decks.commanders))
+            .filter(Decks.tournoi_id == tournoi_id)
+            .order_by(Decks.id)
+            .all()
+        )
+        rows = [
+            (deck.id, (deck.player, CARDS.command_zone_to_str(deck.commanders), ""))
+            for deck in decks
+        ]
+        session.close()
+
+        # Au moins un lot, même vide, pour retirer la ligne factice
+        for start in range(0, max(len(rows), 1), BATCH_SIZE):
+            batch = rows[start : start + BATCH_SIZE]
+            self.pending.put((self.display_decks, (str(tournoi_id), batch)))
+
+    def process_pending(self):
+        """Application des mises à jour en attente, appelée périodiquement par Tk."""
+
+        for _ in range(BATCHES_PER_TICK):
+            try:
+                update, args = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            update(*args)
+
+        self.after(TICK_MS, self.process_pending)
+
+    def clear_page(self, text: str):
+        """Remise à zéro du tableau avant l'affichage d'une nouvelle page."""
+
+        self.tableau.delete(*self.tableau.get_children(""))
+        self.loaded_tournaments.clear()
+        self.configure(text=text)
+
+        self.previous_button.configure(
+            state="normal" if self.browser.has_previous else "disabled"
+        )
+        self.next_button.configure(
+            state="normal" if self.browser.has_next else "disabled"
+        )
+
+    def display_tournaments(self, rows: list):
+        """Affichage d'un lot de tournois."""
+
+        for tournoi_id, values in rows:
+            self.display_tournament(tournoi_id, values)
+
+    def display_decks(self, tournoi_id: str, rows: list):
+        """Affichage d'un lot de decks sous leur tournoi."""
+
+        if not self.tableau.exists(tournoi_id):
+            return  # Tournoi d'une page qui n'est plus affichée
+
+        if self.tableau.exists(f"{tournoi_id}-loading"):
+            self.tableau.delete(f"{tournoi_id}-loading")
+        for deck_id, values in rows:
+            self.insert_deck(tournoi_id, deck_id, values)
+
+    def display_tournament(self, tournoi_id: int, values: tuple):
+        """Affichage du tournoi, ses decks étant chargés au dépliage."""
+
+        if self.tableau.exists(tournoi_id):
+            return
 
         self.tableau.insert(
             "",
             0,
-            values=(tournoi.name, tournoi.date, tournoi.players),
-            iid=tournoi.id,
-            tags=(tournoi.id,),
+            values=values,
+            iid=tournoi_id,
+            tags=(tournoi_id,),
         )
 
-        [
-            Thread(target=self.insert_deck, args=(deck,)).start()
-            for deck in tournoi.decks
-        ]
+        # Ligne factice pour rendre le tournoi dépliable
+        self.tableau.insert(
+            tournoi_id,
+            "end",
+            iid=f"{tournoi_id}-loading",
+            values=("Loading...", "", ""),
+        )
 
-    def insert_deck(self, deck: Decks):
+    def insert_deck(self, tournoi_id: str, deck_id: int, values: tuple):
         """Insertion d'un deck d'après ses données."""
 
         self.tableau.insert(
-            deck.tournoi_id,
+            tournoi_id,
             "end",
-            values=(deck.player, CARDS.command_zone_to_str(deck.commanders), ""),
-            tags=(deck.tournoi_id,),
+            values=values,
+            iid=f"{tournoi_id}-{deck_id}",
+            tags=(tournoi_id,),
         )